@@ -0,0 +1,110 @@
+"""
+Run the hot paths against both the pure Python package and a mypyc-compiled copy of it,
+side by side, to check that compilation actually speeds them up:
+
+    python -m bench.compiled
+
+The compiled copy is built in a temporary directory (this requires mypy and a C
+compiler), and each build is benchmarked in its own subprocess.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+from pathlib import Path
+from timeit import repeat
+from typing import Callable, Dict
+
+from simple_html import DOCTYPE_HTML5, Node, body, div, h1, head, html, li, p, title, ul
+
+REPO_ROOT = Path(__file__).parent.parent
+
+
+def _page() -> Node:
+    return [
+        DOCTYPE_HTML5,
+        html(
+            head(title("A page")),
+            body(
+                h1({"class": "title"}, "A <page>"),
+                ul([li({"class": "item", "data-id": str(i)}, f"item {i} & more") for i in range(100)]),
+            ),
+        ),
+    ]
+
+
+def _hot_paths() -> Dict[str, Callable[[], object]]:
+    from simple_html.core import _render, faster_escape
+
+    page = _page()
+    text = "Some <escaped> text & 'quotes' \"too\"" * 10
+
+    def render_page() -> None:
+        parts: list[str] = []
+        _render((page,), parts.append)
+
+    return {
+        "Tag.__call__": lambda: div({"class": "a", "id": "b"}, p("hello"), "world"),
+        "_render": render_page,
+        "faster_escape": lambda: faster_escape(text),
+    }
+
+
+def _worker(number: int, repeats: int) -> None:
+    from simple_html import is_compiled
+
+    timings = {
+        name: min(repeat(fn, number=number, repeat=repeats)) / number
+        for name, fn in _hot_paths().items()
+    }
+    print(json.dumps({"compiled": is_compiled(), "timings": timings}))
+
+
+def _run(pythonpath: Path, number: int, repeats: int) -> Dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, "-m", "bench.compiled", "--worker", "--number", str(number), "--repeat", str(repeats)],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join([str(pythonpath), str(REPO_ROOT)])},
+        cwd=pythonpath,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    data = json.loads(result.stdout)
+    if data["compiled"] != (pythonpath != REPO_ROOT):
+        raise RuntimeError(f"expected the {'pure' if pythonpath == REPO_ROOT else 'compiled'} build in {pythonpath}")
+    timings: Dict[str, float] = data["timings"]
+    return timings
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--number", type=int, default=2_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--worker", action="store_true")
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args.number, args.repeat)
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as build_dir:
+        shutil.copytree(REPO_ROOT / "simple_html", Path(build_dir) / "simple_html")
+        subprocess.run(
+            [sys.executable, "-m", "mypyc", "simple_html"],
+            cwd=build_dir,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+        pure = _run(REPO_ROOT, args.number, args.repeat)
+        compiled = _run(Path(build_dir), args.number, args.repeat)
+
+    print(f"{'':<16}{'pure (us)':>12}{'compiled (us)':>16}{'speedup':>10}")
+    for name in pure:
+        print(
+            f"{name:<16}{pure[name] * 1e6:>12.2f}{compiled[name] * 1e6:>16.2f}"
+            f"{pure[name] / compiled[name]:>9.2f}x"
+        )
@@ -0,0 +1,103 @@
+"""
+Measure garbage collector pauses while building and rendering large pages, with many
+long-lived prerendered fragments around (as in a big application):
+
+    python -m bench.gc_pauses
+
+Compares the default, `freeze_prerendered()` at startup, and `gc_paused()` around each
+page, and both together.
+"""
+import gc
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Any, Callable, ContextManager, Optional
+
+from simple_html import DOCTYPE_HTML5, Node, SafeString, body, div, h2, head, html, li, p, prerender, render, title, ul
+from simple_html import freeze_prerendered, gc_paused
+
+
+class _PauseRecorder:
+    def __init__(self) -> None:
+        self.pauses: list[float] = []
+        self._start = 0.0
+
+    def __call__(self, phase: str, info: dict[str, Any]) -> None:
+        if phase == "start":
+            self._start = perf_counter()
+        else:
+            self.pauses.append(perf_counter() - self._start)
+
+
+def _page(sections: int) -> Node:
+    return [
+        DOCTYPE_HTML5,
+        html(
+            head(title("a big page")),
+            body(
+                [
+                    div(
+                        {"class": "section", "id": f"section-{i}"},
+                        h2(f"Section {i}"),
+                        p("Some <escaped> text & more text"),
+                        ul([li({"class": "item"}, f"item {j}") for j in range(20)]),
+                    )
+                    for i in range(sections)
+                ]
+            ),
+        ),
+    ]
+
+
+def _long_lived_fragments(count: int) -> list[SafeString]:
+    # stands in for module-level prerendered content and containers across an app
+    return [prerender(div({"class": "fragment"}, p(f"fragment {i}"))) for i in range(count)]
+
+
+def _run(
+    name: str, pages: int, sections: int, pause: Optional[Callable[[], ContextManager[None]]]
+) -> None:
+    recorder = _PauseRecorder()
+    gc.callbacks.append(recorder)
+    latencies: list[float] = []
+    try:
+        for _ in range(pages):
+            start = perf_counter()
+            if pause is None:
+                render(_page(sections))
+            else:
+                with pause():
+                    render(_page(sections))
+            latencies.append(perf_counter() - start)
+    finally:
+        gc.callbacks.remove(recorder)
+
+    pauses = recorder.pauses
+    print(name)
+    print(f"  collections: {len(pauses)}")
+    print(f"  total pause: {sum(pauses) * 1000:.2f} ms, max pause: {max(pauses, default=0) * 1000:.2f} ms")
+    print(
+        f"  per page: mean {sum(latencies) / len(latencies) * 1000:.2f} ms, "
+        f"max {max(latencies) * 1000:.2f} ms\n"
+    )
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--sections", type=int, default=500)
+    parser.add_argument("--fragments", type=int, default=200_000)
+    args = parser.parse_args()
+
+    fragments = _long_lived_fragments(args.fragments)
+    # keep lists of them around too, which the collector has to traverse
+    containers = [fragments[i:i + 10] for i in range(0, len(fragments), 10)]
+
+    _run("default", args.pages, args.sections, None)
+    _run("gc_paused", args.pages, args.sections, gc_paused)
+
+    freeze_prerendered()
+    try:
+        _run("freeze_prerendered", args.pages, args.sections, None)
+        _run("freeze_prerendered + gc_paused", args.pages, args.sections, gc_paused)
+    finally:
+        gc.unfreeze()
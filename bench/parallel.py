@@ -0,0 +1,67 @@
+"""
+Compare `render` with `render_parallel` on a large page, with various numbers of threads.
+
+Scaling is only expected on free-threaded builds of CPython (e.g. 3.13t / 3.14t). Run with
+`PYTHON_GIL=0` and `PYTHON_GIL=1` to compare:
+
+    PYTHON_GIL=0 python3.14t -m bench.parallel
+    PYTHON_GIL=1 python3.14t -m bench.parallel
+"""
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from typing import Callable
+
+from simple_html import DOCTYPE_HTML5, Node, body, div, h2, head, html, li, p, render, render_parallel, title, ul
+
+
+def _page(sections: int) -> list[Node]:
+    return [
+        DOCTYPE_HTML5,
+        html(
+            head(title("a big page")),
+            body(
+                [
+                    div(
+                        {"class": "section", "id": f"section-{i}"},
+                        h2(f"Section {i}"),
+                        p("Some <escaped> text & more text " * 5),
+                        ul([li({"class": "item"}, f"item {j}") for j in range(50)]),
+                    )
+                    for i in range(sections)
+                ]
+            ),
+        ),
+    ]
+
+
+def _time(iterations: int, fn: Callable[[], str]) -> float:
+    start = perf_counter()
+    for _ in range(iterations):
+        fn()
+    return perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--sections", type=int, default=500)
+    parser.add_argument("--threads", type=int, nargs="*", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    is_gil_enabled: Callable[[], bool] = getattr(sys, "_is_gil_enabled", lambda: True)
+    print(f"{sys.version} -- GIL {'enabled' if is_gil_enabled() else 'disabled'}\n")
+
+    page = _page(args.sections)
+
+    print("render")
+    print(f"Execution time: {_time(args.iterations, lambda: render(*page)):.4f} secs\n")
+
+    for threads in args.threads:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            print(f"render_parallel ({threads} threads)")
+            elapsed = _time(
+                args.iterations, lambda: render_parallel(*page, executor=executor)
+            )
+            print(f"Execution time: {elapsed:.4f} secs\n")
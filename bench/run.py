@@ -1,9 +1,11 @@
 from argparse import ArgumentParser
 from dataclasses import dataclass
+from decimal import Decimal
 from time import perf_counter
 from typing import Callable, Dict, Generic, List, TypeVar, Any
 
 from bench import simple, jin, fast, dom
+from simple_html import is_compiled
 
 A = TypeVar("A")
 
@@ -18,6 +20,9 @@ SIMPLE_HTML = "SIMPLE_HTML"
 JINJA2 = "JINJA2"
 FAST_HTML = "FAST_HTML"
 DOMINATE = "DOMINATE"
+SIMPLE_HTML_RENDER_TABLE = "SIMPLE_HTML (render_table)"
+SIMPLE_HTML_STYLES_CACHED = "SIMPLE_HTML (render_styles_cached)"
+SIMPLE_HTML_STYLES_PRECOMPILED = "SIMPLE_HTML (Styles)"
 
 benches: Dict[str, BenchCompare[Any]] = {
     "hello world": BenchCompare(
@@ -50,7 +55,23 @@ benches: Dict[str, BenchCompare[Any]] = {
     "large page": BenchCompare(
         lambda i: f"title {i}",
         {SIMPLE_HTML: simple.large_page, JINJA2: jin.large_page},
-    )
+    ),
+    "table": BenchCompare(
+        lambda i: [(f"name <{j}>", j, j / 3) for j in range(i % 100)],
+        {SIMPLE_HTML: simple.table_rows, SIMPLE_HTML_RENDER_TABLE: simple.table_rows_render_table},
+    ),
+    "styles": BenchCompare(
+        lambda i: i,
+        {
+            SIMPLE_HTML: simple.card_styles,
+            SIMPLE_HTML_STYLES_CACHED: simple.card_styles_cached,
+            SIMPLE_HTML_STYLES_PRECOMPILED: simple.card_styles_precompiled,
+        },
+    ),
+    "mixed types": BenchCompare(
+        lambda i: (i, i / 7, Decimal(i) / 4, f"item {i}"),
+        {SIMPLE_HTML: simple.mixed_types},
+    ),
 }
 
 
@@ -95,6 +116,7 @@ if __name__ == "__main__":
 
     args = parser.parse_args()
 
+    print(f"simple_html is {'compiled' if is_compiled() else 'pure python'}")
     print(f"{args.iterations} ITERATIONS of {args.chunk_size}")
 
     for name, compare_bench in benches.items():
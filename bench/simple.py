@@ -1,3 +1,4 @@
+from decimal import Decimal
 from typing import List, Tuple
 
 from simple_html import (
@@ -22,7 +23,8 @@ from simple_html import (
     nav, a, main, section, article, aside, footer, span, img, time,
     blockquote, code, pre, form, label, input_, textarea, button, table, thead, tbody, tr, th, td
 )
-from simple_html.core import Node, prerender
+from simple_html.core import Node, prerender, render_styles, render_styles_cached, Styles
+from simple_html.table import render_table
 
 
 def hello_world_empty(objs: List[None]) -> None:
@@ -515,3 +517,57 @@ def large_page(titles: list[str]) -> None:
             DOCTYPE_HTML5,
             _html(t, articles)
         )
+
+
+_TABLE_COLUMNS = ["name", "count", "ratio"]
+
+
+def table_rows(objs: List[List[Tuple[str, int, float]]]) -> None:
+    for rows in objs:
+        render(
+            table(
+                thead(tr([th(c) for c in _TABLE_COLUMNS])),
+                tbody([tr(td(name), td(count), td(ratio)) for name, count, ratio in rows]),
+            )
+        )
+
+
+def table_rows_render_table(objs: List[List[Tuple[str, int, float]]]) -> None:
+    for rows in objs:
+        render(render_table(_TABLE_COLUMNS, rows))
+
+
+_CARD_STYLES = {
+    "display": "flex",
+    "flex-direction": "column",
+    "padding": "8px 16px",
+    "border": "1px solid #ddd",
+    "border-radius": "4px",
+    "background-color": "#fafafa",
+}
+
+_card_styles = Styles(_CARD_STYLES, ["width"])
+
+
+def card_styles(widths: List[int]) -> None:
+    for width in widths:
+        render(div({"style": render_styles({**_CARD_STYLES, "width": f"{width % 10}px"})}))
+
+
+def card_styles_cached(widths: List[int]) -> None:
+    for width in widths:
+        render(div({"style": render_styles_cached({**_CARD_STYLES, "width": f"{width % 10}px"})}))
+
+
+def card_styles_precompiled(widths: List[int]) -> None:
+    for width in widths:
+        render(div({"style": _card_styles({"width": f"{width % 10}px"})}))
+
+
+def mixed_types(objs: List[Tuple[int, float, Decimal, str]]) -> None:
+    for i, f, d, s in objs:
+        render(
+            ul(
+                [li(i, br, f, " ", d, hr, s, SafeString("<b>safe</b>"), [i, f, d]) for _ in range(10)]
+            )
+        )
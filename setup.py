@@ -22,7 +22,7 @@ setup(
         "simple_html",
     ]),
     author=project_data["authors"][0]["name"],
-    packages=["simple_html"],
+    packages=["simple_html", "simple_html_tools"],
     python_requires=project_data["requires-python"],
     version=project_data["version"],
     description=project_data["description"],
@@ -1,4 +1,30 @@
 from simple_html.core import SafeString as SafeString, Tag as Tag, render as render, render_styles as render_styles, Node as Node, TagTuple as TagTuple, prerender as prerender
+from simple_html.core import RenderDigest as RenderDigest, render_bytes as render_bytes, stream as stream, escape_many as escape_many
+from simple_html.core import Deferred as Deferred, deferred as deferred
+from simple_html.core import Styles as Styles, render_styles_cached as render_styles_cached
+from simple_html.core import register_safe_attribute_names as register_safe_attribute_names, register_safe_attribute_prefixes as register_safe_attribute_prefixes
+from simple_html.core import register_renderer as register_renderer, SupportsHtml as SupportsHtml
+from simple_html.core import is_compiled as is_compiled
+from simple_html.core import LocalizedPrerender as LocalizedPrerender
+from simple_html.core import RenderBudget as RenderBudget, RenderBudgetExceeded as RenderBudgetExceeded
+from simple_html.core import fingerprint as fingerprint
+from simple_html.core import Lazy as Lazy, lazy as lazy, render_subtree as render_subtree
+from simple_html.core import Component as Component, component as component
+from simple_html.core import MappedPartial as MappedPartial, load_partial as load_partial
+from simple_html.core import EarlyHints as EarlyHints
+from simple_html.core import JsonIsland as JsonIsland, json_island as json_island
+from simple_html.table import render_table as render_table
+from simple_html.parallel import render_parallel as render_parallel
+from simple_html.extract_styles import ExtractedStyles as ExtractedStyles, render_extract_styles as render_extract_styles
+from simple_html.async_render import arender as arender, astream as astream
+from simple_html.composition import CompositionReport as CompositionReport, render_composition as render_composition
+from simple_html.patch import PatchRenderer as PatchRenderer
+from simple_html.gc_control import freeze_prerendered as freeze_prerendered, gc_paused as gc_paused
+from simple_html.memoize import AdaptiveComponent as AdaptiveComponent, adaptive as adaptive
+from simple_html.assets import Asset as Asset, AssetSlot as AssetSlot, asset as asset, asset_slot as asset_slot
+from simple_html.assets import render_with_assets as render_with_assets, stream_with_assets as stream_with_assets
+from simple_html.metrics import MetricsSnapshot as MetricsSnapshot, metrics_snapshot as metrics_snapshot, reset_metrics as reset_metrics
+from simple_html.metrics import enable_metrics as enable_metrics, disable_metrics as disable_metrics, register_cache_stats as register_cache_stats
 
 DOCTYPE_HTML5 = SafeString("<!doctype html>")
 
@@ -0,0 +1,177 @@
+import os
+import threading
+from typing import Final, Generator, Optional
+
+from simple_html.core import Node, SafeString, _render_to_str, render, stream
+
+
+class _AssetCollector:
+    __slots__ = ("streaming", "marker", "seen", "pending", "late", "emitted_slots")
+
+    def __init__(self, streaming: bool) -> None:
+        self.streaming = streaming
+        # slots are rendered as markers, replaced once all assets are known
+        self.marker = f"\x00{os.urandom(8).hex()}:"
+        self.seen: set[str] = set()
+        self.pending: dict[str, list[str]] = {}
+        # assets for slots that were already streamed
+        self.late: list[str] = []
+        self.emitted_slots: list[str] = []
+
+    def declare(self, html: str, slot: str) -> None:
+        if html in self.seen:
+            return
+        self.seen.add(html)
+        if self.streaming and slot in self.emitted_slots:
+            self.late.append(html)
+        else:
+            self.pending.setdefault(slot, []).append(html)
+
+    def slot(self, name: str) -> str:
+        self.emitted_slots.append(name)
+        if not self.streaming:
+            return f"{self.marker}{name}\x00"
+        html = "".join(self.late + self.pending.pop(name, []))
+        self.late = []
+        return html
+
+    def leftover(self) -> str:
+        html = "".join(self.late + [h for assets in self.pending.values() for h in assets])
+        self.late = []
+        self.pending = {}
+        return html
+
+
+_context: Final = threading.local()
+
+
+def _current() -> Optional[_AssetCollector]:
+    collector: Optional[_AssetCollector] = getattr(_context, "collector", None)
+    return collector
+
+
+class Asset:
+    __slots__ = ("node", "slot")
+
+    def __init__(self, node: Node, slot: str) -> None:
+        self.node = node
+        self.slot = slot
+
+    def __html__(self) -> str:
+        collector = _current()
+        if collector is None:
+            return _render_to_str((self.node,), None, None)
+        collector.declare(_render_to_str((self.node,), None, None), self.slot)
+        return ""
+
+    def __repr__(self) -> str:
+        return f"Asset(node={self.node!r}, slot={self.slot!r})"
+
+
+class AssetSlot:
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __html__(self) -> str:
+        collector = _current()
+        if collector is None:
+            return ""
+        return collector.slot(self.name)
+
+    def __repr__(self) -> str:
+        return f"AssetSlot(name={self.name!r})"
+
+
+def asset(node: Node, slot: str = "head") -> Asset:
+    """
+    Declare that a component needs `node` (e.g. a `script` or stylesheet `link`). With
+    `render_with_assets` or `stream_with_assets`, identical assets are rendered once, at
+    the `asset_slot` named `slot`; elsewhere, the asset is rendered in place.
+    """
+    return Asset(node, slot)
+
+
+def asset_slot(name: str = "head") -> AssetSlot:
+    """
+    Where the assets declared for the slot `name` are rendered, e.g. at the end of
+    `<head>`, or at the end of `<body>` for scripts.
+    """
+    return AssetSlot(name)
+
+
+def _render_recording_assets(node: Node) -> tuple[str, tuple[Node, ...]]:
+    """
+    Render `node` on its own, e.g. for `adaptive` to cache. The assets it declares and its
+    slots aren't rendered, but returned as nodes which declare them again (first, in the
+    case of assets) wherever they're rendered, along with the rest of the HTML. Also
+    returns the HTML with the assets' HTML and the slot names, to compare versions by.
+    """
+    collector = _AssetCollector(streaming=False)
+    previous = _current()
+    _context.collector = collector
+    try:
+        # usually while the tree is built, so it isn't counted as a render by metrics
+        html = _render_to_str((node,), None, None)
+    finally:
+        _context.collector = previous
+
+    nodes: list[Node] = []
+    declared: list[str] = []
+    for slot, assets in collector.pending.items():
+        for asset_html in assets:
+            nodes.append(Asset(SafeString(asset_html), slot))
+            declared.append(f"{slot}\x00{asset_html}\x00")
+    parts = html.split(collector.marker)
+    nodes.append(SafeString(parts[0]))
+    for part in parts[1:]:
+        name, _, rest = part.partition("\x00")
+        nodes.append(AssetSlot(name))
+        nodes.append(SafeString(rest))
+    return "".join(declared) + html.replace(collector.marker, "\x00"), tuple(nodes)
+
+
+def render_with_assets(*nodes: Node) -> str:
+    """
+    Render, moving each unique `asset` to its `asset_slot`. Assets whose slot isn't in the
+    page are added at the end.
+    """
+    collector = _AssetCollector(streaming=False)
+    previous = _current()
+    _context.collector = collector
+    try:
+        html = render(*nodes)
+    finally:
+        _context.collector = previous
+
+    for name in collector.emitted_slots:
+        marker = f"{collector.marker}{name}\x00"
+        html = html.replace(marker, "".join(collector.pending.pop(name, [])), 1)
+    return html + collector.leftover()
+
+
+def stream_with_assets(*nodes: Node, chunk_size: int = 8192) -> Generator[bytes, None, None]:
+    """
+    Like `render_with_assets`, but streamed. A slot can only contain the assets declared
+    before it's reached; assets declared after their slot was streamed go in the next
+    slot instead (so put an `asset_slot` at the end of `<body>`), or at the end.
+    """
+    collector = _AssetCollector(streaming=True)
+    chunks = stream(*nodes, chunk_size=chunk_size)
+    while True:
+        # other renders may run on this thread while this generator is suspended, so
+        # the collector is only current while rendering the next chunk
+        previous = _current()
+        _context.collector = collector
+        try:
+            chunk = next(chunks, None)
+        finally:
+            _context.collector = previous
+        if chunk is None:
+            break
+        yield chunk
+
+    leftover = collector.leftover()
+    if leftover:
+        yield leftover.encode()
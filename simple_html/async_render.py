@@ -0,0 +1,284 @@
+import asyncio
+import builtins
+import inspect
+import time
+from types import GeneratorType
+from typing import Any, Awaitable, Callable, Final, Generator, Iterable, Optional, Union, cast
+
+from simple_html.core import (
+    Component,
+    Deferred,
+    EarlyHints,
+    JsonIsland,
+    Lazy,
+    Node,
+    RenderBudget,
+    RenderBudgetExceeded,
+    RenderDigest,
+    _HintsAppend,
+    _render,
+    _stream_buffer,
+    _StreamBuffer,
+    faster_escape,
+)
+
+_Part = Union[str, "asyncio.Future[Node]"]
+
+
+async def _resolve(d: Deferred) -> Node:
+    source = d.source
+    if inspect.isawaitable(source):
+        return await source
+    if inspect.iscoroutinefunction(source):
+        return cast(Node, await source())
+    # plain callables may block, so keep them off the event loop
+    result = await asyncio.to_thread(source)
+    if inspect.isawaitable(result):
+        return await result
+    return result
+
+
+def _start(nodes: Iterable[Node], parts: list[_Part]) -> None:
+    """
+    Walk the tree, rendering everything that's available now into `parts` and starting a
+    task for each awaitable, in place of its output.
+    """
+    for node in nodes:
+        if type(node) is tuple:
+            parts.append(node[0])
+            _start(node[1], parts)
+            parts.append(node[2])
+        elif type(node) is list or type(node) is GeneratorType:
+            _start(node, parts)
+        elif type(node) is Lazy:
+            _start((node.thunk(),), parts)
+        elif type(node) is Component:
+            _start(node.children, parts)
+        elif type(node) is Deferred:
+            parts.append(asyncio.ensure_future(_resolve(node)))
+        elif inspect.isawaitable(node):
+            parts.append(asyncio.ensure_future(node))
+        else:
+            _render((node,), parts.append)
+
+
+async def arender(*nodes: Node) -> str:
+    """
+    Like `render`, but children can also be coroutines or other awaitables, which
+    resolve to `Node`s. All awaitables in the tree are started at once, and the rest of
+    the tree is rendered while they are pending, so independent slow children cost the
+    time of the slowest one rather than the sum of them all. `deferred` nodes are
+    resolved the same way; their fallbacks are not used.
+
+    If an awaitable raises, the others are cancelled and the exception propagates.
+    """
+    parts: list[_Part] = []
+    _start(nodes, parts)
+
+    results: list[str] = []
+    try:
+        for part in parts:
+            if isinstance(part, str):
+                results.append(part)
+            else:
+                # the resolved node may contain awaitables of its own
+                results.append(await arender(await part))
+    finally:
+        for part in parts:
+            if not isinstance(part, str) and not part.done():
+                part.cancel()
+
+    return "".join(results)
+
+
+# mypyc (as of 1.18) crashes when compiled code refers to `StopAsyncIteration` directly,
+# so look it up at runtime instead
+_StopAsyncIteration: Final[Any] = getattr(builtins, "StopAsyncIteration")
+
+_DEFERRED_ID_PREFIX: Final[str] = "sh-deferred-"
+
+# moves the content of `<template id="{prefix}{i}">` to where the fallback was rendered,
+# between the start and end markers, then removes the markers and the fallback
+_SWAP_SCRIPT: Final[str] = (
+    "function $shSwap(i){"
+    f'var d=document,p="{_DEFERRED_ID_PREFIX}"+i,t=d.getElementById(p),'
+    's=d.getElementById(p+"-start"),e=d.getElementById(p+"-end"),n=s.parentNode;'
+    "while(s.nextSibling&&s.nextSibling!==e)n.removeChild(s.nextSibling);"
+    "n.replaceChild(t.content,s);n.removeChild(e);t.parentNode.removeChild(t)}"
+)
+
+
+def _walk(
+    nodes: Iterable[Node],
+    buffer: _StreamBuffer,
+    append: Callable[[str], None],
+    chunk_size: int,
+    pending: "dict[asyncio.Future[Node], int]",
+) -> Generator[Union[bytes, Awaitable[Node]], Optional[Node], None]:
+    """
+    Like `core._stream`, but awaitables are yielded to the caller, which sends back what
+    they resolve to, and `Deferred` nodes are started as tasks and rendered as their
+    fallbacks between two markers.
+    """
+    for node in nodes:
+        if type(node) is tuple:
+            append(node[0])
+            try:
+                yield from _walk(node[1], buffer, append, chunk_size, pending)
+                append(node[2])
+            except RenderBudgetExceeded as e:
+                e.closing_tags.append(node[2])
+                raise
+        elif type(node) is list or type(node) is GeneratorType:
+            yield from _walk(node, buffer, append, chunk_size, pending)
+        elif type(node) is Lazy:
+            yield from _walk((node.thunk(),), buffer, append, chunk_size, pending)
+        elif type(node) is Component:
+            yield from _walk(node.children, buffer, append, chunk_size, pending)
+        elif type(node) is JsonIsland:
+            for piece in node.pieces():
+                append(piece)
+                if buffer.size >= chunk_size:
+                    yield buffer.flush()
+        elif type(node) is Deferred:
+            i = len(pending)
+            pending[asyncio.ensure_future(_resolve(node))] = i
+            append(f'<template id="{_DEFERRED_ID_PREFIX}{i}-start"></template>')
+            yield from _walk((node.fallback,), buffer, append, chunk_size, pending)
+            append(f'<template id="{_DEFERRED_ID_PREFIX}{i}-end"></template>')
+        elif inspect.isawaitable(node):
+            resolved = yield node
+            if resolved is not None:
+                yield from _walk((resolved,), buffer, append, chunk_size, pending)
+        else:
+            _render((node,), append)
+
+        if buffer.size >= chunk_size:
+            yield buffer.flush()
+
+
+class AsyncRenderStream:
+    """
+    An async iterator of utf-8 encoded chunks, returned by `astream`. Call `aclose` if you
+    stop iterating early, to cancel any `deferred` content still pending.
+    """
+    __slots__ = ("_walker", "_buffer", "_pending", "_waiting", "_digest", "_script_start", "_budget", "_close")
+
+    def __init__(
+        self,
+        nodes: Iterable[Node],
+        chunk_size: int,
+        digest: Optional[RenderDigest],
+        nonce: Optional[str],
+        budget: Optional[RenderBudget] = None,
+        hints: Optional[EarlyHints] = None,
+    ) -> None:
+        self._buffer = _stream_buffer(budget)
+        self._budget = budget
+        self._pending: "dict[asyncio.Future[Node], int]" = {}
+        self._waiting: "set[asyncio.Future[Node]]" = set()
+        append: Callable[[str], None] = (
+            self._buffer.append if hints is None else _HintsAppend(hints, self._buffer.append)
+        )
+        # for the end tags of truncated output, which aren't counted against the budget
+        self._close: Callable[[str], None] = (
+            self._buffer.append_unbudgeted
+            if hints is None
+            else _HintsAppend(hints, self._buffer.append_unbudgeted)
+        )
+        self._walker: Optional[Generator[Union[bytes, Awaitable[Node]], Optional[Node], None]] = _walk(
+            nodes, self._buffer, append, chunk_size, self._pending
+        )
+        self._digest = digest
+        self._script_start = "<script>" if nonce is None else f'<script nonce="{faster_escape(nonce)}">'
+
+    def __aiter__(self) -> "AsyncRenderStream":
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            chunk = await self._next_chunk()
+        except RenderBudgetExceeded as e:
+            await self.aclose()
+            if self._budget is None or not self._budget.truncate:
+                raise
+            # end with whatever was rendered within the budget
+            for tag in e.closing_tags:
+                self._close(tag)
+            chunk = self._buffer.flush() if self._buffer.size else None
+        except BaseException:
+            await self.aclose()
+            raise
+
+        if chunk is None:
+            raise _StopAsyncIteration
+        if self._digest is not None:
+            self._digest.update(chunk)
+        return chunk
+
+    async def _next_chunk(self) -> Optional[bytes]:
+        walker = self._walker
+        if walker is not None:
+            try:
+                item = walker.send(None)
+                while not isinstance(item, bytes):
+                    item = walker.send(await item)
+                return item
+            except StopIteration:
+                # the rest of the page goes out right away; then one chunk per batch of
+                # resolved fragments
+                self._walker = None
+                self._waiting = set(self._pending)
+                if self._pending:
+                    self._buffer.append(f"{self._script_start}{_SWAP_SCRIPT}</script>")
+
+        while True:
+            if self._buffer.size:
+                return self._buffer.flush()
+            if not self._waiting:
+                return None
+
+            timeout: Optional[float] = None
+            if self._budget is not None and self._budget.deadline is not None:
+                timeout = max(self._budget.deadline - time.monotonic(), 0)
+            done, self._waiting = await asyncio.wait(
+                self._waiting, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                raise RenderBudgetExceeded("deadline")
+            for task in done:
+                i = self._pending[task]
+                self._buffer.append(f'<template id="{_DEFERRED_ID_PREFIX}{i}">')
+                self._buffer.append(await arender(task.result()))
+                self._buffer.append(f"</template>{self._script_start}$shSwap({i})</script>")
+
+    async def aclose(self) -> None:
+        self._walker = None
+        self._waiting = set()
+        for task in self._pending:
+            if not task.done():
+                task.cancel()
+
+
+def astream(
+    *nodes: Node,
+    chunk_size: int = 8192,
+    digest: Optional[RenderDigest] = None,
+    nonce: Optional[str] = None,
+    budget: Optional[RenderBudget] = None,
+    hints: Optional[EarlyHints] = None,
+) -> AsyncRenderStream:
+    """
+    Stream the page as utf-8 encoded chunks, without waiting for `deferred` nodes: their
+    fallbacks are streamed in place, and as each one resolves, its content is appended
+    to the end of the response in a `<template>`, along with a small script that swaps it
+    in. Other awaitables are awaited in place.
+
+    `nonce` is added to the inline scripts, for Content Security Policies. If a
+    `RenderDigest` is passed it is updated with every chunk. A `RenderBudget` applies to
+    the whole response, including `deferred` content; if its deadline passes while
+    deferred nodes are pending, they are cancelled (and with `truncate=True`, their
+    fallbacks are left in place). `EarlyHints` collect resources from the shell; its
+    `on_head_end` callback runs before the chunk with the end of `<head>` is yielded.
+    """
+    return AsyncRenderStream(nodes, chunk_size, digest, nonce, budget, hints)
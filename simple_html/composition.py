@@ -0,0 +1,148 @@
+import re
+from decimal import Decimal
+from types import GeneratorType
+from typing import Final, Iterable
+
+from simple_html.core import Component, Lazy, Node, SafeString, Tag, _render, faster_escape
+
+_TAG_NAME: Final = re.compile(r"<([^\s/>]+)")
+# attribute values are always quoted, and can't contain `"`
+_ATTRIBUTE: Final = re.compile(r'\s([^\s=>/]+)(?:="[^"]*")?')
+# tags without children are prerendered to a `SafeString` when they're created
+_CHILDLESS_TAG: Final = re.compile(r'<([^\s/>]+)(?:\s[^\s=>/]+(?:="[^"]*")?)*(?:/>|></\1>)')
+
+
+class CompositionReport:
+    """
+    Where the bytes of a rendered page come from, as utf-8 encoded sizes:
+
+    - `tags`: markup of each tag name, i.e. start tags (with their attributes) and end tags
+    - `attributes`: by attribute name; this is a breakdown of part of `tags`
+    - `text`: escaped text, including numbers
+    - `escape_expansion`: how much larger `text` is because of escaping
+    - `safe`: `SafeString`s (e.g. prerendered content) and objects with `__html__`
+    - `other`: anything else, e.g. types with a registered renderer
+    - `components`: the whole output of each `component` label, including nested
+      components
+
+    `tags`, `text`, `safe` and `other` add up to `total`.
+    """
+    __slots__ = (
+        "total",
+        "tags",
+        "attributes",
+        "text",
+        "escape_expansion",
+        "safe",
+        "other",
+        "components",
+    )
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.tags: dict[str, int] = {}
+        self.attributes: dict[str, int] = {}
+        self.text = 0
+        self.escape_expansion = 0
+        self.safe = 0
+        self.other = 0
+        self.components: dict[str, int] = {}
+
+    def _add_tag_markup(self, start: str, end: str) -> None:
+        m = _TAG_NAME.match(start)
+        name = m.group(1) if m is not None else start
+        self.tags[name] = self.tags.get(name, 0) + len(start.encode()) + len(end.encode())
+        for attribute in _ATTRIBUTE.finditer(start, m.end() if m is not None else 0):
+            key = attribute.group(1)
+            self.attributes[key] = self.attributes.get(key, 0) + len(attribute.group(0).encode())
+
+    def summary(self, top: int = 10) -> str:
+        """
+        A plain text summary, with the `top` largest entries of each breakdown.
+        """
+        lines = [
+            f"total: {self.total}",
+            f"  tags: {sum(self.tags.values())}",
+            f"  text: {self.text} (escaping added {self.escape_expansion})",
+            f"  safe: {self.safe}",
+            f"  other: {self.other}",
+        ]
+        for title, sizes in (
+            ("tags", self.tags),
+            ("attributes", self.attributes),
+            ("components", self.components),
+        ):
+            if sizes:
+                lines.append(f"{title}:")
+                for key, size in sorted(sizes.items(), key=lambda item: -item[1])[:top]:
+                    lines.append(f"  {key}: {size}")
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return (
+            f"CompositionReport(total={self.total}, tags={self.tags!r}, "
+            f"attributes={self.attributes!r}, text={self.text}, "
+            f"escape_expansion={self.escape_expansion}, safe={self.safe}, "
+            f"other={self.other}, components={self.components!r})"
+        )
+
+
+def _size(s: str) -> int:
+    return len(s.encode())
+
+
+def _analyze(nodes: Iterable[Node], report: CompositionReport, results: list[str]) -> None:
+    for node in nodes:
+        if type(node) is tuple:
+            report._add_tag_markup(node[0], node[2])
+            results.append(node[0])
+            _analyze(node[1], report, results)
+            results.append(node[2])
+        elif type(node) is str:
+            escaped = faster_escape(node)
+            report.text += _size(escaped)
+            report.escape_expansion += len(escaped) - len(node)
+            results.append(escaped)
+        elif type(node) is SafeString:
+            if _CHILDLESS_TAG.fullmatch(node.safe_str):
+                report._add_tag_markup(node.safe_str, "")
+            else:
+                report.safe += _size(node.safe_str)
+            results.append(node.safe_str)
+        elif type(node) is Tag:
+            report._add_tag_markup(node.rendered, "")
+            results.append(node.rendered)
+        elif type(node) is list or type(node) is GeneratorType:
+            _analyze(node, report, results)
+        elif type(node) is Lazy:
+            _analyze((node.thunk(),), report, results)
+        elif type(node) is Component:
+            before = len(results)
+            _analyze(node.children, report, results)
+            size = sum([_size(s) for s in results[before:]])
+            report.components[node.label] = report.components.get(node.label, 0) + size
+        else:
+            before = len(results)
+            _render((node,), results.append)
+            size = sum([_size(s) for s in results[before:]])
+            if hasattr(node, "__html__"):
+                report.safe += size
+            elif isinstance(node, (str, int, float, Decimal)):
+                report.text += size
+            else:
+                report.other += size
+
+
+def render_composition(*nodes: Node) -> tuple[str, CompositionReport]:
+    """
+    Render, and report how many bytes each kind of output (tags, attributes, text,
+    `SafeString`s) and each `component` contributes, e.g. to see where prerendering
+    would help most. This is much slower than `render`, so it's meant for analysis
+    rather than serving pages.
+    """
+    report = CompositionReport()
+    results: list[str] = []
+    _analyze(nodes, report, results)
+    html = "".join(results)
+    report.total = len(html.encode())
+    return html, report
@@ -1,6 +1,17 @@
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+import time
+import warnings
+from functools import lru_cache
+from html import unescape
 from decimal import Decimal
-from types import GeneratorType
-from typing import Any, Union, Generator, Iterable, Callable, Final, TYPE_CHECKING
+from types import FunctionType, GeneratorType
+from typing import Any, Awaitable, Union, Generator, Iterable, Callable, Final, Optional, Protocol, TYPE_CHECKING, cast
 
 
 class SafeString:
@@ -19,6 +30,10 @@ class SafeString:
         return f"SafeString(safe_str='{self.safe_str}')"
 
 
+class SupportsHtml(Protocol):
+    def __html__(self) -> str: ...
+
+
 def faster_escape(s: str) -> str:
     """
     This is nearly duplicate of html.escape in the standard lib.
@@ -29,10 +44,29 @@ def faster_escape(s: str) -> str:
     if "'" not in s and '"' not in s and '<' not in s and ">" not in s and '&' not in s:
         return s
 
+    if _metrics.enabled:
+        _thread_counters().escapes += 1
     return s.replace(
         "&", "&amp;"   # Must be done first!
     ).replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;").replace('\'', "&#x27;")
 
+
+_ESCAPE_MANY_SEPARATOR: Final[str] = "\x00"
+
+
+def escape_many(strs: list[str]) -> list[str]:
+    """
+    Escape many strings at once. Escaping is character-by-character, so the strings can be
+    joined with a separator `faster_escape` never touches, escaped in one call, and split
+    again. This avoids the per-call overhead of escaping short strings (e.g. table cells)
+    one at a time.
+    """
+    escaped = faster_escape(_ESCAPE_MANY_SEPARATOR.join(strs)).split(_ESCAPE_MANY_SEPARATOR)
+    if len(escaped) == len(strs):
+        return escaped
+    # some string contained the separator
+    return [faster_escape(s) for s in strs]
+
 Node = Union[
     str,
     SafeString,
@@ -43,6 +77,13 @@ Node = Union[
     Generator["Node", None, None],
     "Tag",
     "TagTuple",
+    # e.g. `markupsafe.Markup`; rendered without escaping
+    "SupportsHtml",
+    # only supported by `arender` and `astream`
+    Awaitable["Node"],
+    "Deferred",
+    "Lazy",
+    "Component",
 ]
 
 TagTuple = tuple[str, tuple[Node, ...], str]
@@ -110,6 +151,61 @@ def escape_attribute_key(k: str) -> str:
     )
 
 
+# attribute names made only of these characters are left unchanged by
+# `escape_attribute_key`
+_SAFE_ATTRIBUTE_NAME: Final = re.compile(r"[a-zA-Z_:][-a-zA-Z0-9_:.]*")
+
+# names from `_common_safe_attribute_names` plus any added with `register_safe_attribute_names`
+_safe_attribute_names: set[str] = set(_common_safe_attribute_names)
+_safe_attribute_prefixes: tuple[str, ...] = ()
+
+_ATTRIBUTE_KEY_CACHE_SIZE: Final[int] = 1024
+_attribute_key_cache: dict[str, str] = {}
+
+
+def register_safe_attribute_names(*names: str) -> None:
+    """
+    Mark attribute names as safe, so they are never escaped. Each name must consist only of
+    ASCII letters, digits, and `-_:.`, and not start with a digit, `-` or `.`.
+    """
+    global _safe_attribute_names
+    for name in names:
+        if _SAFE_ATTRIBUTE_NAME.fullmatch(name) is None:
+            raise ValueError(f"{name!r} is not a safe attribute name")
+    # replaced rather than updated, so renders on other threads never see it change
+    _safe_attribute_names = _safe_attribute_names | set(names)
+
+
+def register_safe_attribute_prefixes(*prefixes: str) -> None:
+    """
+    Skip escaping for attribute names that start with one of `prefixes` (e.g. `"data-"`,
+    `"hx-"`), as long as the whole name passes the same check as
+    `register_safe_attribute_names`.
+    """
+    global _safe_attribute_prefixes
+    for prefix in prefixes:
+        if _SAFE_ATTRIBUTE_NAME.fullmatch(prefix) is None:
+            raise ValueError(f"{prefix!r} is not a safe attribute name prefix")
+    _safe_attribute_prefixes = _safe_attribute_prefixes + tuple(prefixes)
+
+
+def _escape_attribute_key_cached(key: str) -> str:
+    escaped = _attribute_key_cache.get(key)
+    if escaped is None:
+        if key.startswith(_safe_attribute_prefixes) and _SAFE_ATTRIBUTE_NAME.fullmatch(key):
+            escaped = key
+        else:
+            escaped = escape_attribute_key(key)
+        # keys can be dynamic (e.g. `data-row-{i}`), so the cache is emptied once it's
+        # full, and refills with the keys that are in use now. Without a lock, threads
+        # racing here can add a few entries past the bound, and may each store the same
+        # key, but they store the same value
+        if len(_attribute_key_cache) >= _ATTRIBUTE_KEY_CACHE_SIZE:
+            _attribute_key_cache.clear()
+        _attribute_key_cache[key] = escaped
+    return escaped
+
+
 class Tag:
     __slots__ = (
         "tag_start",
@@ -148,9 +244,9 @@ class Tag:
                 # where it is not needed. Note this is for attribute names only;
                 # attributes values are always escaped (when they are `str`s)
                 # key_: str
-                if key not in _common_safe_attribute_names:
+                if key not in _safe_attribute_names:
                     key = (
-                        escape_attribute_key(key)
+                        _escape_attribute_key_cached(key)
                         if isinstance(key, str)
                         else key.safe_str
                     )
@@ -177,6 +273,472 @@ class Tag:
         return self._repr
 
 
+DeferredSource = Union[Awaitable[Node], Callable[[], Awaitable[Node]], Callable[[], Node]]
+
+
+class Deferred:
+    __slots__ = ("source", "fallback")
+
+    def __init__(self, source: DeferredSource, fallback: Node) -> None:
+        self.source = source
+        self.fallback = fallback
+
+    def __repr__(self) -> str:
+        return f"Deferred(source={self.source!r}, fallback={self.fallback!r})"
+
+
+def deferred(source: DeferredSource, fallback: Node = "") -> Deferred:
+    """
+    A node whose content is produced later, by an awaitable, a coroutine function or a
+    plain (blocking) function. `astream` renders `fallback` in its place right away and
+    streams the real content at the end of the response once it's ready; `arender` simply
+    waits for it.
+    """
+    return Deferred(source, fallback)
+
+
+class Lazy:
+    __slots__ = ("thunk",)
+
+    def __init__(self, thunk: Callable[[], Node]) -> None:
+        self.thunk = thunk
+
+    def __repr__(self) -> str:
+        return f"Lazy(thunk={self.thunk!r})"
+
+
+def lazy(thunk: Callable[[], Node]) -> Lazy:
+    """
+    A node whose content is only built if it is rendered: `thunk` is called each time
+    the node is rendered, and never if it isn't, e.g. when `render_subtree` renders
+    some other part of the page.
+    """
+    return Lazy(thunk)
+
+
+class Component:
+    __slots__ = ("label", "children")
+
+    def __init__(self, label: str, children: tuple[Node, ...]) -> None:
+        self.label = label
+        self.children = children
+
+    def __repr__(self) -> str:
+        return f"Component(label={self.label!r}, children={self.children!r})"
+
+
+def component(label: str, *children: Node) -> Component:
+    """
+    Label a part of the tree, for `render_composition`'s report. It renders the same as
+    `children`.
+    """
+    return Component(label, children)
+
+
+# Windows doesn't allow replacing a file that is mapped, so partials are read there instead
+_MAP_PARTIALS: Final[bool] = os.name != "nt"
+
+
+class MappedPartial:
+    """
+    A file of (trusted, utf-8) HTML, memory-mapped rather than read into each process.
+    `render_bytes` and `stream` write its bytes as they are, without decoding them into a
+    `str`; `render` decodes it.
+
+    The file is checked for changes at most every `check_interval` seconds, when the
+    partial is rendered. It is only reloaded if its mtime or size changed, and the new
+    content is only used if its hash differs, so touching a file is cheap. Update files
+    by replacing them (e.g. writing a new file and renaming it over the old one), not by
+    writing to them in place: a mapped file that is truncated can crash the process.
+    """
+    __slots__ = ("path", "check_interval", "digest", "_data", "_stat", "_checked_at", "_lock")
+
+    def __init__(self, path: str, check_interval: float = 1.0) -> None:
+        self.path = path
+        self.check_interval = check_interval
+        self.digest = ""
+        self._data: Union[mmap.mmap, bytes] = b""
+        self._stat = (0, -1)
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reload()
+        self._checked_at = time.monotonic()
+
+    def _reload(self) -> None:
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if (st.st_mtime_ns, st.st_size) == self._stat:
+                return
+            data: Union[mmap.mmap, bytes]
+            if _MAP_PARTIALS and st.st_size:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                # an empty file can't be mapped
+                data = f.read()
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if digest != self.digest:
+            # the old map is closed once no render is using it any more
+            self._data = data
+            self.digest = digest
+        self._stat = (st.st_mtime_ns, st.st_size)
+
+    def data(self) -> memoryview:
+        """
+        the current content, first checking the file for changes if it's time to
+        """
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            # other threads keep using the current content rather than waiting
+            try:
+                self._checked_at = now
+                self._reload()
+            finally:
+                self._lock.release()
+        return memoryview(self._data)
+
+    def __html__(self) -> str:
+        return str(self.data(), "utf-8")
+
+    def __repr__(self) -> str:
+        return f"MappedPartial(path={self.path!r}, check_interval={self.check_interval!r})"
+
+
+_mapped_partials: dict[str, MappedPartial] = {}
+_mapped_partials_lock: Final = threading.Lock()
+
+
+def load_partial(path: str, check_interval: float = 1.0) -> MappedPartial:
+    """
+    A `MappedPartial` for `path`; the same one is returned for the same path, so each
+    file is mapped once per process. If it's loaded with different `check_interval`s,
+    the smallest is used.
+    """
+    abs_path = os.path.abspath(path)
+    with _mapped_partials_lock:
+        partial = _mapped_partials.get(abs_path)
+        if partial is None:
+            partial = MappedPartial(abs_path, check_interval)
+            _mapped_partials[abs_path] = partial
+        elif check_interval < partial.check_interval:
+            partial.check_interval = check_interval
+    return partial
+
+
+_JSON_SCRIPT: Final = Tag("script")
+
+# lists and dicts with at least this many items are split into pieces; their other items
+# are encoded in batches of up to `_JSON_BATCH`, each in one call to the (C) encoder
+_JSON_SPLIT_MIN: Final[int] = 16
+_JSON_BATCH: Final[int] = 256
+
+
+def _script_safe(s: str) -> str:
+    # `<`, `>` and `&` can only be in JSON strings, where the escapes mean the same thing.
+    # `replace` returns `s` itself if there's nothing to replace
+    return s.replace("&", "\\u0026").replace("<", "\\u003c").replace(">", "\\u003e")
+
+
+class JsonIsland:
+    """
+    A `<script type="application/json">` containing `obj` as JSON, made with
+    `json_island`. It's encoded as it's rendered, in pieces.
+    """
+    __slots__ = ("obj", "tag_start", "_encoder")
+
+    def __init__(self, obj: Any, tag_start: str, default: Optional[Callable[[Any], Any]]) -> None:
+        self.obj = obj
+        self.tag_start = tag_start
+        self._encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=default)
+
+    def pieces(self) -> Generator[str, None, None]:
+        """
+        the start tag, the script-safe JSON in pieces, and the end tag
+        """
+        yield self.tag_start
+        yield from self._pieces(self.obj, set())
+        yield _JSON_SCRIPT.closing_tag
+
+    def _pieces(self, obj: Any, markers: set[int]) -> Generator[str, None, None]:
+        if isinstance(obj, (list, tuple)):
+            yield from self._list_pieces(obj, markers)
+        elif isinstance(obj, dict):
+            yield from self._dict_pieces(obj, markers)
+        else:
+            yield _script_safe(self._encoder.encode(obj))
+
+    def _batch(self, batch: Union[list[Any], dict[Any, Any]]) -> str:
+        # the items of the batch, without its brackets
+        return _script_safe(self._encoder.encode(batch)[1:-1])
+
+    def _list_pieces(self, obj: Union[list[Any], tuple[Any, ...]], markers: set[int]) -> Generator[str, None, None]:
+        if id(obj) in markers:
+            raise ValueError("Circular reference detected")
+        markers.add(id(obj))
+        yield "["
+        first = True
+        batch: list[Any] = []
+        for item in obj:
+            if isinstance(item, (list, tuple, dict)) and len(item) >= _JSON_SPLIT_MIN:
+                if batch:
+                    if not first:
+                        yield ","
+                    yield self._batch(batch)
+                    batch = []
+                    first = False
+                if not first:
+                    yield ","
+                yield from self._pieces(item, markers)
+                first = False
+            else:
+                batch.append(item)
+                if len(batch) >= _JSON_BATCH:
+                    if not first:
+                        yield ","
+                    yield self._batch(batch)
+                    batch = []
+                    first = False
+        if batch:
+            if not first:
+                yield ","
+            yield self._batch(batch)
+        yield "]"
+        markers.discard(id(obj))
+
+    def _dict_pieces(self, obj: dict[Any, Any], markers: set[int]) -> Generator[str, None, None]:
+        if id(obj) in markers:
+            raise ValueError("Circular reference detected")
+        markers.add(id(obj))
+        yield "{"
+        first = True
+        batch: dict[Any, Any] = {}
+        for key, value in obj.items():
+            # other keys are left to the encoder, which converts them to strings
+            if isinstance(key, str) and isinstance(value, (list, tuple, dict)) and len(value) >= _JSON_SPLIT_MIN:
+                if batch:
+                    if not first:
+                        yield ","
+                    yield self._batch(batch)
+                    batch = {}
+                    first = False
+                if not first:
+                    yield ","
+                yield _script_safe(self._encoder.encode(key))
+                yield ":"
+                yield from self._pieces(value, markers)
+                first = False
+            else:
+                batch[key] = value
+                if len(batch) >= _JSON_BATCH:
+                    if not first:
+                        yield ","
+                    yield self._batch(batch)
+                    batch = {}
+                    first = False
+        if batch:
+            if not first:
+                yield ","
+            yield self._batch(batch)
+        yield "}"
+        markers.discard(id(obj))
+
+    def __html__(self) -> str:
+        return "".join(self.pieces())
+
+    def __repr__(self) -> str:
+        return f"JsonIsland(obj={self.obj!r}, tag_start={self.tag_start!r})"
+
+
+def json_island(
+    obj: Any,
+    attributes: Optional[dict[Union[SafeString, str], Union[str, SafeString, int, float, Decimal, None]]] = None,
+    default: Optional[Callable[[Any], Any]] = None,
+) -> JsonIsland:
+    """
+    Embed `obj` as JSON in a `<script type="application/json">` with `attributes` (e.g.
+    an `id`), to be read with `JSON.parse(el.textContent)`. `<`, `>` and `&` are escaped
+    as `\\u003c` etc., so the script can't be closed early. Large lists and dicts are
+    encoded item by item while rendering, straight into the output (and between chunks
+    when streaming), so there's no full-size JSON string, or copies of it, as with
+    `SafeString(json.dumps(obj).replace(...))`. `default` is passed to the JSON encoder,
+    for types it doesn't support.
+    """
+    attrs: dict[Union[SafeString, str], Union[str, SafeString, int, float, Decimal, None]] = {
+        "type": "application/json"
+    }
+    if attributes:
+        attrs.update(attributes)
+    tag_start = cast(TagTuple, _JSON_SCRIPT(attrs, ""))[0]
+    return JsonIsland(obj, tag_start, default)
+
+
+class _BytesOutput:
+    """
+    collects output for `render_bytes`. `append` collects `str` pieces as usual;
+    `MappedPartial`s are written as bytes when they're rendered to this `append`.
+    """
+    __slots__ = ("parts", "chunks", "append")
+
+    def __init__(self) -> None:
+        self.parts: list[str] = []
+        self.chunks: list[Union[bytes, memoryview]] = []
+        self.append: Callable[[str], None] = self.parts.append
+
+    def write(self, data: memoryview) -> None:
+        if self.parts:
+            self.chunks.append("".join(self.parts).encode())
+            self.parts.clear()
+        self.chunks.append(data)
+
+    def getvalue(self) -> bytes:
+        if not self.chunks:
+            return "".join(self.parts).encode()
+        self.chunks.append("".join(self.parts).encode())
+        return b"".join(self.chunks)
+
+    def getvalue_hashed(self, digest: "RenderDigest") -> bytes:
+        """
+        `getvalue`, updating `digest` with the output. Pieces are encoded and hashed in
+        groups, which is much cheaper than one at a time, while each group is still in cache
+        """
+        parts = self.parts
+        chunks = self.chunks
+        for i in range(0, len(parts), _HASHED_GROUP_SIZE):
+            chunks.append("".join(parts[i:i + _HASHED_GROUP_SIZE]).encode())
+        for chunk in chunks:
+            digest.update(chunk)
+        return b"".join(chunks)
+
+
+# pieces of output encoded and hashed together by `_BytesOutput.getvalue_hashed`
+_HASHED_GROUP_SIZE: Final[int] = 256
+
+
+# the `_BytesOutput` of the `render_bytes` call in progress on this thread, if any
+_bytes_output: Final = threading.local()
+
+
+NodeRenderer = Callable[[Any, Callable[[str], None]], None]
+
+
+def _render_tag(node: Any, append_to_list: Callable[[str], None]) -> None:
+    append_to_list(node.rendered)
+
+
+def _render_list(node: list[Node], append_to_list: Callable[[str], None]) -> None:
+    # lists of plain strings are common for bulk text (e.g. columns of a table).
+    # Since escaping works character-by-character, they can be joined and escaped
+    # in a single call.
+    for item in node:
+        if type(item) is not str:
+            _render(node, append_to_list)
+            return
+    append_to_list(faster_escape("".join(cast(list[str], node))))
+
+
+def _render_generator(node: Any, append_to_list: Callable[[str], None]) -> None:
+    _render(node, append_to_list)
+
+
+def _render_number(node: Any, append_to_list: Callable[[str], None]) -> None:
+    append_to_list(str(node))
+
+
+def _render_str(node: Any, append_to_list: Callable[[str], None]) -> None:
+    append_to_list(faster_escape(node))
+
+
+def _render_safe_string(node: Any, append_to_list: Callable[[str], None]) -> None:
+    append_to_list(node.safe_str)
+
+
+def _render_lazy(node: Any, append_to_list: Callable[[str], None]) -> None:
+    _render((node.thunk(),), append_to_list)
+
+
+def _render_component(node: Any, append_to_list: Callable[[str], None]) -> None:
+    _render(node.children, append_to_list)
+
+
+def _render_mapped_partial(node: Any, append_to_list: Callable[[str], None]) -> None:
+    output: Optional[_BytesOutput] = getattr(_bytes_output, "current", None)
+    if output is not None and output.append is append_to_list:
+        output.write(node.data())
+    else:
+        append_to_list(node.__html__())
+
+
+def _render_json_island(node: Any, append_to_list: Callable[[str], None]) -> None:
+    for piece in node.pieces():
+        append_to_list(piece)
+
+
+def _render_html_protocol(node: Any, append_to_list: Callable[[str], None]) -> None:
+    # e.g. `markupsafe.Markup`, whose `__html__` returns itself -- no copy needed
+    append_to_list(node.__html__())
+
+
+# renderers for types other than `SafeString`, `str` and `tuple`, which `_render`
+# checks first. The subclasses of these types are handled by `_find_renderer`
+_builtin_renderers: Final[dict[type, NodeRenderer]] = {
+    Tag: _render_tag,
+    list: _render_list,
+    GeneratorType: _render_generator,
+    int: _render_number,
+    float: _render_number,
+    Decimal: _render_number,
+    str: _render_str,
+    SafeString: _render_safe_string,
+    Lazy: _render_lazy,
+    Component: _render_component,
+    MappedPartial: _render_mapped_partial,
+    JsonIsland: _render_json_island,
+}
+
+_registered_renderers: dict[type, NodeRenderer] = {}
+_register_renderer_lock: Final = threading.Lock()
+
+# the lookup table used by `_render`. Includes `_builtin_renderers`,
+# `_registered_renderers`, and renderers found for other types by `_find_renderer`
+_renderers: dict[type, NodeRenderer] = dict(_builtin_renderers)
+
+
+def register_renderer(type_: type, fn: Callable[[Any], Node]) -> None:
+    """
+    Render instances of `type_` (and its subclasses) by converting them to a `Node` with
+    `fn`. The returned `Node` is rendered as usual, so `str`s are escaped.
+    """
+
+    def render_converted(node: Any, append_to_list: Callable[[str], None]) -> None:
+        _render((fn(node),), append_to_list)
+
+    global _registered_renderers, _renderers
+    with _register_renderer_lock:
+        _registered_renderers = {**_registered_renderers, type_: render_converted}
+        # subclasses may have been assigned another renderer already, so the table starts
+        # over. It's replaced in one step, so renders on other threads see either table
+        _renderers = {**_builtin_renderers, **_registered_renderers}
+
+
+def _find_renderer(t: type) -> NodeRenderer:
+    # if `register_renderer` replaces the table meanwhile, the result is only added to
+    # this one, which is discarded
+    renderers = _renderers
+    renderer: Optional[NodeRenderer] = None
+    if hasattr(t, "__html__"):
+        renderer = _render_html_protocol
+    else:
+        for base in t.__mro__[1:]:
+            renderer = renderers.get(base)
+            if renderer is not None:
+                break
+
+    if renderer is None:
+        raise TypeError(f"Got unknown type: {t}")
+
+    renderers[t] = renderer
+    return renderer
+
+
 def _render(nodes: Iterable[Node], append_to_list: Callable[[str], None]) -> None:
     """
     mutate a list instead of constantly rendering strings
@@ -190,16 +752,26 @@ def _render(nodes: Iterable[Node], append_to_list: Callable[[str], None]) -> Non
             append_to_list(faster_escape(node))
         elif type(node) is tuple:
             append_to_list(node[0])
-            _render(node[1], append_to_list)
-            append_to_list(node[2])
+            try:
+                _render(node[1], append_to_list)
+                append_to_list(node[2])
+            except RenderBudgetExceeded as e:
+                # so that truncated output can be closed
+                e.closing_tags.append(node[2])
+                raise
         elif type(node) is Tag:
             append_to_list(node.rendered)
-        elif type(node) is list or type(node) is GeneratorType:
+        elif type(node) is list:
+            _render_list(node, append_to_list)
+        elif type(node) is GeneratorType:
             _render(node, append_to_list)
-        elif isinstance(node, (int, float, Decimal)):
-            append_to_list(str(node))
         else:
-            raise TypeError(f"Got unknown type: {type(node)}")
+            # everything else is looked up by type, so that every other type costs the
+            # same and new ones can be added with `register_renderer`
+            renderer = _renderers.get(type(node))
+            if renderer is None:
+                renderer = _find_renderer(type(node))
+            renderer(node, append_to_list)
 
 
 _common_safe_css_props: Final[frozenset[str]] = frozenset(
@@ -416,8 +988,12 @@ _common_safe_css_props: Final[frozenset[str]] = frozenset(
 
 
 
+StyleKey = Union[str, SafeString]
+StyleValue = Union[str, int, float, Decimal, SafeString]
+
+
 def render_styles(
-    styles: dict[Union[str, SafeString], Union[str, int, float, Decimal, SafeString]]
+    styles: dict[StyleKey, StyleValue]
 ) -> SafeString:
     ret: list[str] = []
     app = ret.append
@@ -439,12 +1015,744 @@ def render_styles(
     return SafeString("".join(ret))
 
 
-def render(*nodes: Node) -> str:
+@lru_cache(maxsize=1024)
+def _render_style_items(items: tuple[tuple[StyleKey, StyleValue], ...]) -> SafeString:
+    return render_styles(dict(items))
+
+
+def render_styles_cached(styles: dict[StyleKey, StyleValue]) -> SafeString:
+    """
+    `render_styles`, with the results for the 1024 most recently used style dicts
+    cached. Note that numerically equal values (e.g. `1` and `1.0`) share a cache entry;
+    they render to equivalent CSS.
+    """
+    return _render_style_items(tuple(styles.items()))
+
+
+class Styles:
+    """
+    Styles where most declarations are constant. The `static` declarations are rendered
+    once, up front; only the `variable` properties are accepted, and rendered, on each
+    call.
+    """
+    __slots__ = ("static", "_variable_keys")
+
+    def __init__(
+        self, static: dict[StyleKey, StyleValue], variable: Iterable[StyleKey] = ()
+    ) -> None:
+        self.static = render_styles(static)
+        self._variable_keys: dict[StyleKey, str] = {}
+        for k in variable:
+            if isinstance(k, SafeString):
+                self._variable_keys[k] = k.safe_str + ":"
+            elif k in _common_safe_css_props:
+                self._variable_keys[k] = k + ":"
+            else:
+                self._variable_keys[k] = faster_escape(k) + ":"
+
+    def __call__(self, variable: Optional[dict[StyleKey, StyleValue]] = None) -> SafeString:
+        if not variable:
+            return self.static
+
+        ret: list[str] = [self.static.safe_str]
+        app = ret.append
+        for k, v in variable.items():
+            key = self._variable_keys.get(k)
+            if key is None:
+                raise KeyError(f"{k!r} is not a variable property of these Styles")
+
+            if isinstance(v, SafeString):
+                app(f"{key}{v.safe_str};")
+            elif isinstance(v, str):
+                app(f"{key}{faster_escape(v)};")
+            else:
+                app(f"{key}{v};")
+
+        return SafeString("".join(ret))
+
+    def __repr__(self) -> str:
+        return f"Styles(static={self.static!r}, variable={tuple(self._variable_keys)!r})"
+
+
+class RenderBudgetExceeded(Exception):
+    """
+    raised when rendering passes a limit of its `RenderBudget`. `limit` is the name of
+    the limit: "max_bytes", "max_nodes" or "deadline". `closing_tags` are the end tags of
+    the elements that were still open, innermost first
+    """
+    def __init__(self, limit: str) -> None:
+        super().__init__(f"render budget exceeded: {limit}")
+        self.limit = limit
+        self.closing_tags: list[str] = []
+
+
+class RenderBudget:
+    """
+    Limits for a single render, to stop runaway pages early:
+
+    - `max_bytes`: the size of the output, UTF-8 encoded (also when rendering to a `str`)
+    - `max_nodes`: the number of pieces of output, i.e. text and other leaf nodes, and
+      the start and end of each tag
+    - `deadline`: a `time.monotonic()` time, checked every few pieces
+
+    When a limit is passed, `RenderBudgetExceeded` is raised, or with `truncate=True`
+    the output ends after the last piece within the limits, followed by the end tags of
+    the elements still open. Those aren't counted against the limits.
+    """
+    __slots__ = ("max_bytes", "max_nodes", "deadline", "truncate")
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_nodes: Optional[int] = None,
+        deadline: Optional[float] = None,
+        truncate: bool = False,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_nodes = max_nodes
+        self.deadline = deadline
+        self.truncate = truncate
+
+    def __repr__(self) -> str:
+        return (
+            f"RenderBudget(max_bytes={self.max_bytes!r}, max_nodes={self.max_nodes!r}, "
+            f"deadline={self.deadline!r}, truncate={self.truncate!r})"
+        )
+
+
+# checking the clock is comparatively slow, so the deadline is checked every this many pieces
+_DEADLINE_CHECK_INTERVAL: Final[int] = 64
+
+
+class _BudgetedAppend:
+    """
+    wraps an append callable, keeping count of what goes through it against a budget
+    """
+    __slots__ = ("_append", "_max_bytes", "_max_nodes", "_deadline", "size", "nodes")
+
+    def __init__(self, budget: RenderBudget, append: Callable[[str], None]) -> None:
+        self._append = append
+        self._max_bytes = budget.max_bytes
+        self._max_nodes = budget.max_nodes
+        self._deadline = budget.deadline
+        self.size = 0
+        self.nodes = 0
+
+    def check(self, size: int) -> None:
+        self.nodes += 1
+        self.size += size
+        if self._max_bytes is not None and self.size > self._max_bytes:
+            raise RenderBudgetExceeded("max_bytes")
+        if self._max_nodes is not None and self.nodes > self._max_nodes:
+            raise RenderBudgetExceeded("max_nodes")
+        if (
+            self._deadline is not None
+            and self.nodes % _DEADLINE_CHECK_INTERVAL == 1
+            and time.monotonic() > self._deadline
+        ):
+            raise RenderBudgetExceeded("deadline")
+
+    def __call__(self, s: str) -> None:
+        self.check(_utf8_length(s))
+        self._append(s)
+
+
+def _utf8_length(s: str) -> int:
+    # checking is cheap (CPython keeps track of whether a string is ASCII), unlike encoding
+    return len(s) if s.isascii() else len(s.encode())
+
+
+class EarlyHints:
+    """
+    Collects the resources a page links to -- stylesheets, `preload`, `modulepreload` and
+    `preconnect` links, and scripts with a `src` -- as it's rendered, as values for `Link`
+    headers, e.g. to send in a `103 Early Hints` response. `on_head_end` is called once
+    the end of `<head>` has been rendered, while the body is still to come.
+    """
+    __slots__ = ("links", "on_head_end", "_head_ended")
+
+    def __init__(self, on_head_end: Optional[Callable[["EarlyHints"], None]] = None) -> None:
+        self.links: list[str] = []
+        self.on_head_end = on_head_end
+        self._head_ended = False
+
+    def link_header(self) -> str:
+        return ", ".join(self.links)
+
+    def _add(self, url: str, params: str) -> None:
+        # the url is unescaped, so make sure it can't break out of the header value
+        if not url or _UNSAFE_LINK_URL.search(url) is not None:
+            return
+        link = f"<{url}>; {params}"
+        if link not in self.links:
+            self.links.append(link)
+
+    def _add_tag(self, tag: str) -> None:
+        attrs = {m.group(1).lower(): unescape(m.group(2) or "") for m in _HINT_ATTRIBUTE.finditer(tag)}
+        if tag.startswith("<script"):
+            src = attrs.get("src")
+            if src is not None:
+                rel = "modulepreload" if attrs.get("type") == "module" else "preload; as=script"
+                self._add(src, f"rel={rel}")
+            return
+
+        href = attrs.get("href")
+        rel = attrs.get("rel", "").lower()
+        if href is None:
+            return
+        if rel == "stylesheet":
+            self._add(href, "rel=preload; as=style")
+        elif rel in ("preload", "modulepreload", "preconnect"):
+            params = f"rel={rel}"
+            for key in ("as", "type", "crossorigin"):
+                value = attrs.get(key)
+                if value is not None and _LINK_PARAM_VALUE.fullmatch(value):
+                    params += f"; {key}={value}" if value else f"; {key}"
+            self._add(href, params)
+
+    def observe(self, s: str) -> None:
+        if "<link" in s or "<script" in s:
+            for m in _HINT_TAG.finditer(s):
+                self._add_tag(m.group(0))
+        if not self._head_ended and "</head>" in s:
+            self._head_ended = True
+            if self.on_head_end is not None:
+                self.on_head_end(self)
+
+    def __repr__(self) -> str:
+        return f"EarlyHints(links={self.links!r})"
+
+
+_HINT_TAG: Final = re.compile(r"<(?:link|script)\s[^>]*>")
+_HINT_ATTRIBUTE: Final = re.compile(r'\s([a-zA-Z][-a-zA-Z]*)(?:="([^"]*)")?')
+_UNSAFE_LINK_URL: Final = re.compile(r"[\x00-\x20<>\x7f]")
+_LINK_PARAM_VALUE: Final = re.compile(r"[-a-zA-Z0-9/+.]*")
+
+
+class _HintsAppend:
+    __slots__ = ("_hints", "_append")
+
+    def __init__(self, hints: EarlyHints, append: Callable[[str], None]) -> None:
+        self._hints = hints
+        self._append = append
+
+    def __call__(self, s: str) -> None:
+        self._hints.observe(s)
+        self._append(s)
+
+
+# upper bounds (in seconds) of the buckets of sampled render times
+RENDER_TIME_BUCKETS: Final[tuple[float, ...]] = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0
+)
+
+
+class _MetricsConfig:
+    __slots__ = ("enabled", "sample_every")
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_every = 0
+
+
+_metrics: Final = _MetricsConfig()
+
+
+class _RenderCounters:
+    """
+    one thread's metrics. Only that thread writes to them, so they aren't locked
+    """
+    __slots__ = ("renders", "output_chars", "output_bytes", "escapes", "sampled", "sampled_seconds", "buckets", "depth", "countdown")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.reset()
+
+    def reset(self) -> None:
+        self.countdown = 0
+        self.renders = 0
+        self.output_chars = 0
+        self.output_bytes = 0
+        self.escapes = 0
+        self.sampled = 0
+        self.sampled_seconds = 0.0
+        # the last bucket is for renders slower than all of `RENDER_TIME_BUCKETS`
+        self.buckets = [0] * (len(RENDER_TIME_BUCKETS) + 1)
+
+    def start(self, timed: bool) -> float:
+        """
+        called before a render; returns its start time if it's sampled, or -1
+        """
+        self.depth += 1
+        if not timed or self.depth > 1 or _metrics.sample_every <= 0:
+            return -1.0
+        self.countdown -= 1
+        if self.countdown > 0:
+            return -1.0
+        self.countdown = _metrics.sample_every
+        return time.perf_counter()
+
+    def finish(self, start: float, chars: int, output_bytes: int) -> None:
+        """
+        called after a render, with the size of its output as a `str` or as `bytes`
+        """
+        self.depth -= 1
+        # renders inside a render (e.g. of cached components) are part of the outer one
+        if self.depth:
+            return
+        self.renders += 1
+        self.output_chars += chars
+        self.output_bytes += output_bytes
+        if start >= 0:
+            elapsed = time.perf_counter() - start
+            self.sampled += 1
+            self.sampled_seconds += elapsed
+            self.buckets[bisect.bisect_left(RENDER_TIME_BUCKETS, elapsed)] += 1
+
+    def abandon(self) -> None:
+        """
+        called instead of `finish` after a render that isn't counted, e.g. that failed
+        """
+        self.depth -= 1
+
+    def record(self, output_bytes: int) -> None:
+        """
+        count a render that isn't timed, e.g. a finished stream
+        """
+        if not self.depth:
+            self.renders += 1
+            self.output_bytes += output_bytes
+
+
+# the counters of each thread, by thread id. A new thread that gets a finished thread's id
+# carries on with its counters, so totals never go down and this doesn't keep growing
+_all_counters: Final[dict[int, _RenderCounters]] = {}
+_all_counters_lock: Final = threading.Lock()
+_counters_local: Final = threading.local()
+
+
+def _thread_counters() -> _RenderCounters:
+    counters: Optional[_RenderCounters] = getattr(_counters_local, "counters", None)
+    if counters is None:
+        with _all_counters_lock:
+            counters = _all_counters.setdefault(threading.get_ident(), _RenderCounters())
+        _counters_local.counters = counters
+    return counters
+
+
+def render(
+    *nodes: Node, budget: Optional[RenderBudget] = None, hints: Optional[EarlyHints] = None
+) -> str:
+    if _metrics.enabled:
+        counters = _thread_counters()
+        start = counters.start(True)
+        try:
+            html = _render_to_str(nodes, budget, hints)
+        except BaseException:
+            counters.abandon()
+            raise
+        counters.finish(start, len(html), 0)
+        return html
+    return _render_to_str(nodes, budget, hints)
+
+
+def _render_to_str(nodes: tuple[Node, ...], budget: Optional[RenderBudget], hints: Optional[EarlyHints]) -> str:
     results: list[str] = []
-    _render(nodes, results.append)
+    if budget is None and hints is None:
+        _render(nodes, results.append)
+        return "".join(results)
+
+    append: Callable[[str], None] = results.append if hints is None else _HintsAppend(hints, results.append)
+    if budget is None:
+        _render(nodes, append)
+    else:
+        try:
+            _render(nodes, _BudgetedAppend(budget, append))
+        except RenderBudgetExceeded as e:
+            if not budget.truncate:
+                raise
+            for tag in e.closing_tags:
+                append(tag)
 
     return "".join(results)
 
 
 def prerender(*nodes: Node) -> SafeString:
-    return SafeString(render(*nodes))
+    # part of building a tree, so not counted as a render by metrics
+    return SafeString(_render_to_str(nodes, None, None))
+
+
+def _find_by_id(nodes: Iterable[Node], id_attr: str, lazies: list[Lazy]) -> Optional[TagTuple]:
+    for node in nodes:
+        if type(node) is tuple:
+            if id_attr in node[0]:
+                return node
+            found = _find_by_id(node[1], id_attr, lazies)
+            if found is not None:
+                return found
+        elif type(node) is list or type(node) is GeneratorType:
+            found = _find_by_id(node, id_attr, lazies)
+            if found is not None:
+                return found
+        elif type(node) is Lazy:
+            lazies.append(node)
+        elif type(node) is Component:
+            found = _find_by_id(node.children, id_attr, lazies)
+            if found is not None:
+                return found
+    return None
+
+
+def render_subtree(*nodes: Node, id: str) -> str:
+    """
+    Render only the element with the given `id`, e.g. for htmx or Turbo partial
+    responses built by the full page function. The rest of the tree is searched but not
+    rendered, and `lazy` nodes are only built if the element isn't found outside of
+    them. Elements are found by the `id` attribute of their start tag, so the element
+    must have children (an empty element is prerendered to a `SafeString`), and content
+    inside `SafeString`s isn't searched.
+
+    Raises `ValueError` if there is no such element.
+    """
+    # attribute values are escaped, so this can only match an actual `id` attribute
+    id_attr = f' id="{faster_escape(id)}"'
+    lazies: list[Lazy] = []
+    found = _find_by_id(nodes, id_attr, lazies)
+    while found is None and lazies:
+        pending = lazies
+        lazies = []
+        for lazy_node in pending:
+            found = _find_by_id((lazy_node.thunk(),), id_attr, lazies)
+            if found is not None:
+                break
+
+    if found is None:
+        raise ValueError(f"no element with id {id!r}")
+    return render(found)
+
+
+class LocalizedPrerender:
+    """
+    `prerender` for content that varies by locale. `build` is called with a locale and
+    returns the `Node` for it; each locale is rendered once, on first use or up front
+    for the `locales` given, and afterwards looking it up is a dict access.
+    """
+    __slots__ = ("_build", "_variants")
+
+    def __init__(self, build: Callable[[str], Node], locales: Iterable[str] = ()) -> None:
+        self._build = build
+        self._variants: dict[str, SafeString] = {}
+        for locale in locales:
+            self._variants[locale] = prerender(build(locale))
+
+    def __call__(self, locale: str) -> SafeString:
+        variant = self._variants.get(locale)
+        if variant is None:
+            variant = prerender(self._build(locale))
+            self._variants[locale] = variant
+        return variant
+
+    @property
+    def locales(self) -> tuple[str, ...]:
+        return tuple(self._variants)
+
+    def reload(self, *locales: str) -> None:
+        """
+        Re-render the given locales (by default, all that have been rendered so far),
+        e.g. after their message catalogs are reloaded. Each variant is replaced once
+        its new version is rendered, so lookups never see a missing entry.
+        """
+        for locale in locales or tuple(self._variants):
+            self._variants[locale] = prerender(self._build(locale))
+
+    def __repr__(self) -> str:
+        return f"LocalizedPrerender(build={self._build!r}, locales={self.locales!r})"
+
+
+def _fingerprint_parts(nodes: Iterable[Node], append: Callable[[str], None]) -> None:
+    # every part is tagged with its type, and variable-length values are length-prefixed,
+    # so different trees can't produce the same sequence
+    for node in nodes:
+        if type(node) is str:
+            append(f"s{len(node)}:{node}")
+        elif type(node) is SafeString:
+            append(f"S{len(node.safe_str)}:{node.safe_str}")
+        elif type(node) is tuple:
+            append(f"({len(node[0])}:{node[0]}")
+            _fingerprint_parts(node[1], append)
+            append(f"){len(node[2])}:{node[2]}")
+        elif type(node) is Tag:
+            append(f"t{len(node.rendered)}:{node.rendered}")
+        elif type(node) is list:
+            append("[")
+            _fingerprint_parts(node, append)
+            append("]")
+        elif isinstance(node, (int, float, Decimal)):
+            append(f"n{type(node).__qualname__}:{node!s};")
+        elif isinstance(node, str):
+            append(f"s{type(node).__qualname__}:{len(node)}:{node}")
+        elif type(node) is GeneratorType:
+            raise TypeError("generators can't be fingerprinted; they would be consumed")
+        elif type(node) is Lazy:
+            raise TypeError("lazy nodes can't be fingerprinted without building them")
+        elif type(node) is MappedPartial:
+            # the digest is of the content, so it needn't be hashed again
+            node.data()
+            append(f"m{node.digest}")
+        elif type(node) is Component:
+            append(f"c{len(node.label)}:{node.label}")
+            _fingerprint_parts(node.children, append)
+            append("c")
+        elif hasattr(node, "__html__"):
+            html = cast(SupportsHtml, node).__html__()
+            append(f"h{len(html)}:{html}")
+        else:
+            raise TypeError(f"Got unknown type: {type(node)}")
+
+
+def fingerprint(*nodes: Node) -> str:
+    """
+    A stable hash of a `Node` tree, e.g. to use as a cache key for trees that contain
+    lists, which aren't hashable. Nothing is rendered or escaped. Trees built the same
+    way have the same fingerprint, in any process. Generators, awaitables and other
+    types without a stable value raise `TypeError`.
+    """
+    parts: list[str] = []
+    _fingerprint_parts(nodes, parts.append)
+    return hashlib.blake2b("".join(parts).encode(), digest_size=16).hexdigest()
+
+
+class RenderDigest:
+    """
+    A running hash and byte count of utf-8 encoded output. Renderers update it as
+    they encode the output, so a strong ETag and exact Content-Length are available
+    without hashing the finished page in a second pass.
+    """
+    __slots__ = ("_hash", "content_length")
+
+    def __init__(self, algorithm: str = "sha256") -> None:
+        self._hash = hashlib.new(algorithm)
+        self.content_length = 0
+
+    def update(self, chunk: Union[bytes, memoryview]) -> None:
+        self._hash.update(chunk)
+        self.content_length += len(chunk)
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def etag(self) -> str:
+        return f'"{self._hash.hexdigest()}"'
+
+
+def render_bytes(
+    *nodes: Node,
+    digest: Optional[RenderDigest] = None,
+    budget: Optional[RenderBudget] = None,
+    hints: Optional[EarlyHints] = None,
+) -> bytes:
+    """
+    render to utf-8 encoded bytes. If a `RenderDigest` is passed, it's updated as the
+    output is encoded, a group of pieces at a time, rather than hashing the whole
+    page afterwards.
+    """
+    if _metrics.enabled:
+        counters = _thread_counters()
+        start = counters.start(True)
+        try:
+            html = _render_bytes(nodes, digest, budget, hints)
+        except BaseException:
+            counters.abandon()
+            raise
+        counters.finish(start, 0, len(html))
+        return html
+    return _render_bytes(nodes, digest, budget, hints)
+
+
+def _render_bytes(
+    nodes: tuple[Node, ...],
+    digest: Optional[RenderDigest],
+    budget: Optional[RenderBudget],
+    hints: Optional[EarlyHints],
+) -> bytes:
+    if digest is None and budget is None and hints is None:
+        output = _BytesOutput()
+        previous = getattr(_bytes_output, "current", None)
+        _bytes_output.current = output
+        try:
+            _render(nodes, output.append)
+        finally:
+            _bytes_output.current = previous
+        return output.getvalue()
+    if digest is None:
+        return _render_to_str(nodes, budget, hints).encode()
+
+    output = _BytesOutput()
+    append: Callable[[str], None] = output.append if hints is None else _HintsAppend(hints, output.append)
+    if budget is None:
+        previous = getattr(_bytes_output, "current", None)
+        _bytes_output.current = output
+        try:
+            _render(nodes, append)
+        finally:
+            _bytes_output.current = previous
+    else:
+        try:
+            _render(nodes, _BudgetedAppend(budget, append))
+        except RenderBudgetExceeded as e:
+            if not budget.truncate:
+                raise
+            for tag in e.closing_tags:
+                append(tag)
+    return output.getvalue_hashed(digest)
+
+
+class _StreamBuffer:
+    __slots__ = ("parts", "size")
+
+    def __init__(self) -> None:
+        self.parts: list[str] = []
+        self.size = 0
+
+    def append(self, s: str) -> None:
+        self.parts.append(s)
+        self.size += len(s)
+
+    def append_unbudgeted(self, s: str) -> None:
+        self.parts.append(s)
+        self.size += len(s)
+
+    def flush(self) -> bytes:
+        chunk = "".join(self.parts).encode()
+        self.parts.clear()
+        self.size = 0
+        return chunk
+
+    def check_bytes(self, size: int) -> None:
+        """
+        called for output written directly as bytes rather than appended
+        """
+
+
+class _BudgetedStreamBuffer(_StreamBuffer):
+    __slots__ = ("_budget",)
+
+    def __init__(self, budget: RenderBudget) -> None:
+        super().__init__()
+        self._budget = _BudgetedAppend(budget, self.parts.append)
+
+    def append(self, s: str) -> None:
+        self._budget.check(_utf8_length(s))
+        self.parts.append(s)
+        self.size += len(s)
+
+    def check_bytes(self, size: int) -> None:
+        self._budget.check(size)
+
+
+def _stream_buffer(budget: Optional[RenderBudget]) -> _StreamBuffer:
+    return _StreamBuffer() if budget is None else _BudgetedStreamBuffer(budget)
+
+
+def _stream(
+    nodes: Iterable[Node],
+    buffer: _StreamBuffer,
+    append: Callable[[str], None],
+    chunk_size: int,
+) -> Generator[bytes, None, None]:
+    # containers are walked here so output can be yielded between children; everything
+    # else is handed to `_render`. Output goes through `append`, which ends at `buffer`
+    for node in nodes:
+        if type(node) is tuple:
+            append(node[0])
+            try:
+                yield from _stream(node[1], buffer, append, chunk_size)
+                append(node[2])
+            except RenderBudgetExceeded as e:
+                e.closing_tags.append(node[2])
+                raise
+        elif type(node) is list or type(node) is GeneratorType:
+            yield from _stream(node, buffer, append, chunk_size)
+        elif type(node) is Lazy:
+            yield from _stream((node.thunk(),), buffer, append, chunk_size)
+        elif type(node) is Component:
+            yield from _stream(node.children, buffer, append, chunk_size)
+        elif type(node) is MappedPartial:
+            data = node.data()
+            buffer.check_bytes(len(data))
+            if buffer.size:
+                yield buffer.flush()
+            for i in range(0, len(data), chunk_size):
+                yield data[i:i + chunk_size].tobytes()
+        elif type(node) is JsonIsland:
+            for piece in node.pieces():
+                append(piece)
+                if buffer.size >= chunk_size:
+                    yield buffer.flush()
+        else:
+            _render((node,), append)
+
+        if buffer.size >= chunk_size:
+            yield buffer.flush()
+
+
+def stream(
+    *nodes: Node,
+    chunk_size: int = 8192,
+    digest: Optional[RenderDigest] = None,
+    budget: Optional[RenderBudget] = None,
+    hints: Optional["EarlyHints"] = None,
+) -> Generator[bytes, None, None]:
+    """
+    render incrementally, yielding utf-8 encoded chunks of roughly `chunk_size`
+    characters. If a `RenderDigest` is passed, it is updated with each chunk, so once the
+    stream is exhausted it can be used for a trailer or cache entry. If `EarlyHints` are
+    passed, their `on_head_end` callback runs before the chunk with the end of `<head>`
+    is yielded.
+    """
+    buffer = _stream_buffer(budget)
+    append: Callable[[str], None] = buffer.append if hints is None else _HintsAppend(hints, buffer.append)
+    measured = _metrics.enabled
+    size = 0
+    try:
+        for chunk in _stream(nodes, buffer, append, chunk_size):
+            if digest is not None:
+                digest.update(chunk)
+            if measured:
+                size += len(chunk)
+            yield chunk
+    except RenderBudgetExceeded as e:
+        if budget is None or not budget.truncate:
+            raise
+        close = buffer.append_unbudgeted if hints is None else _HintsAppend(hints, buffer.append_unbudgeted)
+        for tag in e.closing_tags:
+            close(tag)
+
+    if buffer.size:
+        chunk = buffer.flush()
+        if digest is not None:
+            digest.update(chunk)
+        size += len(chunk)
+        yield chunk
+    if measured:
+        _thread_counters().record(size)
+
+
+def is_compiled() -> bool:
+    """
+    whether simple_html is running as a mypyc-compiled extension (as in the published
+    wheels), rather than as pure Python, which is considerably slower
+    """
+    # compiled functions are native callables rather than Python function objects
+    return not isinstance(faster_escape, FunctionType)
+
+
+# set SIMPLE_HTML_WARN_PURE_PYTHON=1 to be warned when e.g. no compiled wheel was available
+# for the platform and the pure Python fallback was installed
+if os.environ.get("SIMPLE_HTML_WARN_PURE_PYTHON") and not is_compiled():
+    warnings.warn(
+        "simple_html is running as pure Python; install a compiled wheel for better performance",
+        RuntimeWarning,
+        stacklevel=2,
+    )
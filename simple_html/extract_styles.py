@@ -0,0 +1,231 @@
+import re
+import threading
+from html import unescape
+from typing import Final, Optional
+
+from simple_html.core import Node, SafeString, _render
+
+# our own rendered attribute values never contain `"`, `<` or `>` (they're escaped), so a
+# start tag is everything between `<` and the next `>`
+_TAG_WITH_STYLE: Final = re.compile(r'<[a-zA-Z][^<>]*?\sstyle="[^"]*"[^<>]*>')
+_STYLE_ATTR: Final = re.compile(r'\sstyle="([^"]*)"')
+_CLASS_ATTR: Final = re.compile(r'\sclass="([^"]*)"')
+
+# each `:not(#\#)` adds as much specificity as an id selector (and matches any element
+# whose id isn't "#"), so the rules override stylesheet rules with up to 3 ids, the way
+# inline styles override all of them
+_SPECIFICITY_BOOST: Final[str] = ":not(#\\#)" * 3
+
+_BASE36: Final[str] = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def _to_base36(i: int) -> str:
+    digits: list[str] = []
+    while True:
+        i, r = divmod(i, 36)
+        digits.append(_BASE36[r])
+        if i == 0:
+            return "".join(reversed(digits))
+
+
+def _split_declarations(css: str) -> list[str]:
+    """
+    split on `;`s that aren't inside quotes or parentheses, e.g. `url("a;b")`
+    """
+    declarations: list[str] = []
+    start = 0
+    depth = 0
+    quote = ""
+    escaped = False
+    for i, c in enumerate(css):
+        if escaped:
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        elif quote:
+            if c == quote:
+                quote = ""
+        elif c == '"' or c == "'":
+            quote = c
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == ";" and depth <= 0:
+            declarations.append(css[start:i])
+            start = i + 1
+    declarations.append(css[start:])
+    return [d.strip() for d in declarations if d.strip()]
+
+
+def _is_declaration_list(css: str) -> bool:
+    """
+    whether `css` only holds declarations: no `{`, `}` or `@` outside of strings, and no
+    unclosed comment, string or parenthesis. In a `style` attribute, anything else is
+    just an invalid declaration, but in a rule it could end the rule and restyle the
+    rest of the page, or swallow the rules after it
+    """
+    depth = 0
+    quote = ""
+    i = 0
+    n = len(css)
+    while i < n:
+        c = css[i]
+        if c == "\\":
+            # escapes the next character, inside strings or not
+            if i + 1 == n:
+                return False
+            i += 1
+        elif quote:
+            if c == quote:
+                quote = ""
+            elif c == "\n" or c == "\r" or c == "\f":
+                # an unescaped newline ends a string, leaving the rest unparsed
+                return False
+        elif c == '"' or c == "'":
+            quote = c
+        elif c == "/" and css.startswith("*", i + 1):
+            end = css.find("*/", i + 2)
+            if end == -1:
+                return False
+            i = end + 1
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if depth < 0:
+                return False
+        elif c == "{" or c == "}" or c == "@":
+            return False
+        i += 1
+    return not quote and depth == 0
+
+
+def _to_rule_body(style_attr_value: str, important: bool) -> str:
+    """
+    Turn an (escaped) inline style into the body of a CSS rule, optionally making each
+    declaration `!important`
+    """
+    # entities are decoded in attributes, but not in `<style>` blocks. `<` can't appear in
+    # valid CSS outside of strings, where it can be escaped, so this also makes sure the
+    # rules can't close the `<style>` tag
+    css = unescape(style_attr_value).replace("<", "\\3c ")
+
+    declarations: list[str] = []
+    for d in _split_declarations(css):
+        if not important or d.replace(" ", "").lower().endswith("!important"):
+            declarations.append(d)
+        else:
+            declarations.append(f"{d} !important")
+    return ";".join(declarations)
+
+
+class ExtractedStyles:
+    """
+    Maps each unique inline style to a generated class name. Reuse one instance across
+    renders to keep class names stable, e.g. to serve `css()` as a single external
+    stylesheet. An instance can be shared by renders on several threads.
+
+    Inline styles override stylesheet rules (other than `!important` ones) regardless of
+    specificity. The generated rules get the specificity of 3 ids, which overrides
+    all but the most specific stylesheet rules, while styles set by scripts (on
+    `element.style`) and CSS animations can still override them, as they can inline
+    styles. With `important=True`, each declaration is made `!important` instead, which
+    overrides any normal stylesheet rule, but also scripts' styles and animations.
+    """
+    __slots__ = ("class_prefix", "important", "classes", "_lock")
+
+    def __init__(self, class_prefix: str = "_s", important: bool = False) -> None:
+        self.class_prefix = class_prefix
+        self.important = important
+        self.classes: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def class_for(self, style_attr_value: str) -> str:
+        class_name = self.classes.get(style_attr_value)
+        if class_name is None:
+            # names are numbered by how many there are, so they're added one at a time
+            with self._lock:
+                class_name = self.classes.get(style_attr_value)
+                if class_name is None:
+                    class_name = self.class_prefix + _to_base36(len(self.classes))
+                    self.classes[style_attr_value] = class_name
+        return class_name
+
+    def css(self) -> str:
+        selector_suffix = "" if self.important else _SPECIFICITY_BOOST
+        with self._lock:
+            classes = list(self.classes.items())
+        return "".join(
+            [
+                f".{class_name}{selector_suffix}{{{_to_rule_body(style, self.important)}}}"
+                for style, class_name in classes
+            ]
+        )
+
+    def style_tag(self) -> SafeString:
+        return SafeString(f"<style>{self.css()}</style>")
+
+    def _replace_tag(self, m: "re.Match[str]") -> str:
+        tag = m.group(0)
+        style_match = _STYLE_ATTR.search(tag)
+        if style_match is None or not style_match.group(1).strip():
+            return tag
+        style = style_match.group(1)
+        if style not in self.classes and not _is_declaration_list(unescape(style)):
+            # left inline, where it can't affect other elements
+            return tag
+
+        class_name = self.class_for(style)
+        tag = tag[:style_match.start()] + tag[style_match.end():]
+
+        class_match = _CLASS_ATTR.search(tag)
+        if class_match is not None:
+            end = class_match.end(1)
+            separator = " " if class_match.group(1) else ""
+            return f"{tag[:end]}{separator}{class_name}{tag[end:]}"
+        if tag.endswith("/>"):
+            return f'{tag[:-2]} class="{class_name}"/>'
+        return f'{tag[:-1]} class="{class_name}">'
+
+    def rewrite(self, html: str) -> str:
+        if ' style="' not in html:
+            return html
+        return _TAG_WITH_STYLE.sub(self._replace_tag, html)
+
+
+def render_extract_styles(
+    *nodes: Node, styles: Optional[ExtractedStyles] = None, inline: bool = True
+) -> tuple[str, ExtractedStyles]:
+    """
+    Render, replacing each unique `style` attribute with a short generated class. Styles
+    that aren't just a list of declarations (e.g. with a `}` or an unclosed comment
+    outside of strings) are left inline, since as rules they could affect the rest of
+    the page. With
+    `inline=True`, a single `<style>` block with the rules is inserted before `</head>`
+    (or at the start of the output, after any doctype, if there isn't one). Otherwise
+    the rules are left for the caller, e.g. to serve as an external stylesheet via
+    `ExtractedStyles.css()`.
+    """
+    if styles is None:
+        styles = ExtractedStyles()
+    rewrite = styles.rewrite
+
+    results: list[str] = []
+    app = results.append
+
+    def append_rewritten(s: str) -> None:
+        app(rewrite(s))
+
+    _render(nodes, append_rewritten)
+    html = "".join(results)
+
+    if inline and styles.classes:
+        style_tag = styles.style_tag().safe_str
+        insert_at = html.find("</head>")
+        if insert_at == -1:
+            # keep a doctype first, so the page isn't rendered in quirks mode
+            insert_at = html.find(">") + 1 if html[:9].lower() == "<!doctype" else 0
+        html = html[:insert_at] + style_tag + html[insert_at:]
+
+    return html, styles
@@ -0,0 +1,49 @@
+import gc
+from types import TracebackType
+from typing import Optional
+
+
+def freeze_prerendered() -> None:
+    """
+    Move everything that exists now -- prerendered `SafeString`s, `Tag`s, and anything
+    else created at import time -- into the permanent generation, so the cyclic garbage
+    collector no longer scans them. Call it once, after startup, e.g. before forking
+    workers. Objects created afterwards are collected as usual.
+    """
+    # collect first, so garbage from startup isn't kept forever
+    gc.collect()
+    gc.freeze()
+
+
+class _GcPaused:
+    __slots__ = ("_was_enabled",)
+
+    def __init__(self) -> None:
+        self._was_enabled = False
+
+    def __enter__(self) -> None:
+        self._was_enabled = gc.isenabled()
+        gc.disable()
+
+    def __exit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if self._was_enabled:
+            gc.enable()
+            # one young collection now, rather than one every few hundred allocations
+            if gc.get_count()[0] > gc.get_threshold()[0]:
+                gc.collect(0)
+
+
+def gc_paused() -> _GcPaused:
+    """
+    Suspend cyclic garbage collection for a block, e.g. building and rendering a large
+    page, which allocates many tuples and would otherwise trigger many collections along
+    the way. At the end, the collector is re-enabled, and runs once if enough
+    allocations have built up. Reference counting still frees almost all of the tree as
+    usual; only reference cycles wait for the collector.
+    """
+    return _GcPaused()
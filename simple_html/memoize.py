@@ -0,0 +1,151 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from types import GeneratorType
+from typing import Any, Callable, Final, Hashable, Optional
+
+from simple_html.assets import _render_recording_assets
+from simple_html.core import Component, Node, fingerprint
+from simple_html.metrics import register_cache_stats
+
+_MAX_ENTRIES: Final[int] = 1024
+
+
+class _Streak:
+    __slots__ = ("digest", "count")
+
+    def __init__(self, digest: bytes) -> None:
+        self.digest = digest
+        self.count = 1
+
+
+class AdaptiveComponent:
+    """
+    A component function that caches its output for inputs that keep producing the same
+    HTML. Made with `adaptive`.
+    """
+    __slots__ = ("_fn", "label", "threshold", "max_entries", "_streaks", "_cache", "_lock", "hits", "misses")
+
+    def __init__(self, fn: Callable[..., Node], label: str, threshold: int, max_entries: int) -> None:
+        self._fn = fn
+        self.label = label
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # both are LRUs, oldest first, so one-off inputs don't keep stable ones out
+        self._streaks: OrderedDict[Hashable, _Streak] = OrderedDict()
+        self._cache: OrderedDict[Hashable, tuple[Node, ...]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def promoted(self) -> int:
+        """how many inputs are currently cached"""
+        return len(self._cache)
+
+    def _key(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Optional[Hashable]:
+        # generators hash by identity, and are never passed again
+        for a in (*args, *kwargs.values()):
+            if type(a) is GeneratorType:
+                return None
+        # with their types, since e.g. `1`, `1.0` and `True` are equal, but render differently
+        key: Hashable = (
+            tuple([(type(a), a) for a in args]),
+            tuple(sorted([(name, type(v), v) for name, v in kwargs.items()])),
+        )
+        try:
+            hash(key)
+            return key
+        except TypeError:
+            pass
+        # e.g. lists of nodes
+        try:
+            return (fingerprint(*args), tuple([(name, fingerprint(kwargs[name])) for name in sorted(kwargs)]))
+        except TypeError:
+            return None
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Node:
+        key = self._key(args, kwargs)
+        if key is None:
+            return Component(self.label, (self._fn(*args, **kwargs),))
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+        if cached is not None:
+            return Component(self.label, cached)
+
+        # assets (see `asset`) are kept as nodes, so they're declared again each time the
+        # output is rendered, rather than only while it's rendered here
+        html, output = _render_recording_assets(self._fn(*args, **kwargs))
+        digest = hashlib.blake2b(html.encode(), digest_size=16).digest()
+        # only the bookkeeping is locked, so a streak is never counted or promoted with
+        # another thread's output
+        with self._lock:
+            self.misses += 1
+            streak = self._streaks.get(key)
+            if streak is None:
+                if len(self._streaks) >= self.max_entries:
+                    self._streaks.popitem(last=False)
+                streak = _Streak(digest)
+                self._streaks[key] = streak
+            else:
+                self._streaks.move_to_end(key)
+                if streak.digest != digest:
+                    streak.digest = digest
+                    streak.count = 1
+                else:
+                    streak.count += 1
+
+            if streak.count >= self.threshold:
+                if len(self._cache) >= self.max_entries:
+                    self._cache.popitem(last=False)
+                self._cache[key] = output
+                self._streaks.pop(key, None)
+
+        return Component(self.label, output)
+
+    def bump_version(self) -> None:
+        """
+        forget all cached output and history, e.g. after the data or templates it
+        depends on change in a way its inputs don't show
+        """
+        with self._lock:
+            self._streaks = OrderedDict()
+            self._cache = OrderedDict()
+
+    def __repr__(self) -> str:
+        return (
+            f"AdaptiveComponent(label={self.label!r}, threshold={self.threshold!r}, "
+            f"hits={self.hits!r}, misses={self.misses!r}, promoted={self.promoted!r})"
+        )
+
+
+def adaptive(
+    label: Optional[str] = None, threshold: int = 3, max_entries: int = _MAX_ENTRIES
+) -> Callable[[Callable[..., Node]], AdaptiveComponent]:
+    """
+    Decorate a component function to memoize it adaptively: its output is rendered on
+    each call and hashed, and once the same inputs have produced identical output
+    `threshold` times in a row, that output is cached as a `SafeString` and reused for
+    those inputs. Assets it declares with `asset` are cached with it, and declared again
+    each time it's rendered. Inputs are compared by value -- hashable arguments directly,
+    and `Node` trees by `fingerprint`; calls with generators or other unhashable
+    arguments aren't cached. Objects that hash by identity count as the same input even
+    if they're mutated, so bump the version when they change.
+
+    The output is labelled as a `component` (by default, with the function's name).
+    Call `bump_version()` on the decorated function to drop its cached output. At most
+    `max_entries` inputs are tracked, and cached; the least recently used are dropped
+    first. Its hits and misses are included in
+    `metrics_snapshot()`, as the cache `adaptive.<label>`.
+    """
+    def decorator(fn: Callable[..., Node]) -> AdaptiveComponent:
+        name = label if label is not None else getattr(fn, "__name__", "component")
+        component = AdaptiveComponent(fn, name, threshold, max_entries)
+        register_cache_stats(f"adaptive.{name}", lambda: (component.hits, component.misses))
+        return component
+
+    return decorator
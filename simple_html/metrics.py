@@ -0,0 +1,249 @@
+import threading
+import time
+from typing import Callable, Final, Optional
+
+from simple_html.core import (
+    RENDER_TIME_BUCKETS,
+    _all_counters,
+    _all_counters_lock,
+    _metrics,
+    _render_style_items,
+)
+
+CacheStats = Callable[[], tuple[int, int]]
+
+
+def _styles_cache_stats() -> tuple[int, int]:
+    info = _render_style_items.cache_info()
+    return info.hits, info.misses
+
+
+_cache_stats: Final[list[tuple[str, CacheStats]]] = [("render_styles_cached", _styles_cache_stats)]
+_cache_stats_lock: Final = threading.Lock()
+# cache counts at the last `reset_metrics`, which caches' own counts aren't reset by
+_cache_baselines: Final[dict[str, tuple[int, int]]] = {}
+
+
+def register_cache_stats(name: str, stats: CacheStats) -> None:
+    """
+    Include a cache in the metrics: `stats` returns its `(hits, misses)` so far. Caches
+    registered with the same name are added up.
+    """
+    with _cache_stats_lock:
+        _cache_stats.append((name, stats))
+
+
+def _current_cache_stats() -> dict[str, tuple[int, int]]:
+    with _cache_stats_lock:
+        sources = list(_cache_stats)
+    totals: dict[str, tuple[int, int]] = {}
+    for name, stats in sources:
+        hits, misses = stats()
+        previous_hits, previous_misses = totals.get(name, (0, 0))
+        totals[name] = (previous_hits + hits, previous_misses + misses)
+    return totals
+
+
+class MetricsSnapshot:
+    """
+    Render metrics added up over all threads, since metrics were enabled or last reset.
+    Made with `metrics_snapshot`.
+
+    `renders` counts `render`, `render_bytes`, `render_parallel` and `stream` calls (a
+    stream once it's exhausted), but not renders inside a render, nor those done while
+    building a tree (by `prerender`, `render_table` or `adaptive`). `output_chars` is the
+    characters rendered to `str`s (by `render` and `render_parallel`), and
+    `output_bytes` the bytes rendered by `render_bytes` and `stream`. `escapes` counts
+    strings that needed escaping. One in every `sample_every` non-streaming calls on
+    each thread is timed: there are `sampled` of them, which took `sampled_seconds` in
+    total, and `buckets` counts them by `RENDER_TIME_BUCKETS` (non-cumulatively; the
+    last is for slower renders). `caches` maps cache names to `(hits, misses)`.
+    """
+    __slots__ = ("taken_at", "renders", "output_chars", "output_bytes", "escapes", "sampled", "sampled_seconds", "buckets", "caches")
+
+    def __init__(
+        self,
+        taken_at: float,
+        renders: int,
+        output_chars: int,
+        output_bytes: int,
+        escapes: int,
+        sampled: int,
+        sampled_seconds: float,
+        buckets: tuple[int, ...],
+        caches: dict[str, tuple[int, int]],
+    ) -> None:
+        self.taken_at = taken_at
+        self.renders = renders
+        self.output_chars = output_chars
+        self.output_bytes = output_bytes
+        self.escapes = escapes
+        self.sampled = sampled
+        self.sampled_seconds = sampled_seconds
+        self.buckets = buckets
+        self.caches = caches
+
+    def hit_rate(self, cache: str) -> Optional[float]:
+        """
+        the fraction of lookups in `cache` that were hits, or `None` if there were none
+        """
+        hits, misses = self.caches.get(cache, (0, 0))
+        if not hits + misses:
+            return None
+        return hits / (hits + misses)
+
+    def since(self, previous: "MetricsSnapshot") -> "MetricsSnapshot":
+        """
+        the metrics between `previous` and this snapshot, e.g. for rates, or for StatsD
+        counters, which are sent as increments
+        """
+        caches = {}
+        for name, (hits, misses) in self.caches.items():
+            previous_hits, previous_misses = previous.caches.get(name, (0, 0))
+            caches[name] = (hits - previous_hits, misses - previous_misses)
+        return MetricsSnapshot(
+            self.taken_at,
+            self.renders - previous.renders,
+            self.output_chars - previous.output_chars,
+            self.output_bytes - previous.output_bytes,
+            self.escapes - previous.escapes,
+            self.sampled - previous.sampled,
+            self.sampled_seconds - previous.sampled_seconds,
+            tuple([n - p for n, p in zip(self.buckets, previous.buckets)]),
+            caches,
+        )
+
+    def prometheus(self, prefix: str = "simple_html") -> str:
+        """
+        the metrics in the Prometheus text exposition format
+        """
+        lines = [
+            f"# HELP {prefix}_renders_total Renders completed.",
+            f"# TYPE {prefix}_renders_total counter",
+            f"{prefix}_renders_total {self.renders}",
+            f"# HELP {prefix}_output_chars_total Characters rendered to strings.",
+            f"# TYPE {prefix}_output_chars_total counter",
+            f"{prefix}_output_chars_total {self.output_chars}",
+            f"# HELP {prefix}_output_bytes_total Bytes rendered.",
+            f"# TYPE {prefix}_output_bytes_total counter",
+            f"{prefix}_output_bytes_total {self.output_bytes}",
+            f"# HELP {prefix}_escapes_total Strings that needed escaping.",
+            f"# TYPE {prefix}_escapes_total counter",
+            f"{prefix}_escapes_total {self.escapes}",
+            f"# HELP {prefix}_render_seconds Time taken by sampled renders.",
+            f"# TYPE {prefix}_render_seconds histogram",
+        ]
+        cumulative = 0
+        for bound, count in zip(RENDER_TIME_BUCKETS, self.buckets):
+            cumulative += count
+            lines.append(f'{prefix}_render_seconds_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{prefix}_render_seconds_bucket{{le="+Inf"}} {self.sampled}')
+        lines.append(f"{prefix}_render_seconds_sum {self.sampled_seconds!r}")
+        lines.append(f"{prefix}_render_seconds_count {self.sampled}")
+
+        if self.caches:
+            lines.append(f"# HELP {prefix}_cache_hits_total Cache hits.")
+            lines.append(f"# TYPE {prefix}_cache_hits_total counter")
+            for name, (hits, _) in self.caches.items():
+                lines.append(f'{prefix}_cache_hits_total{{cache="{_label_value(name)}"}} {hits}')
+            lines.append(f"# HELP {prefix}_cache_misses_total Cache misses.")
+            lines.append(f"# TYPE {prefix}_cache_misses_total counter")
+            for name, (_, misses) in self.caches.items():
+                lines.append(f'{prefix}_cache_misses_total{{cache="{_label_value(name)}"}} {misses}')
+        return "\n".join(lines) + "\n"
+
+    def statsd(self, prefix: str = "simple_html") -> list[str]:
+        """
+        StatsD lines for the counts in this snapshot, which should be the increments
+        since the last report (see `since`): counters, and gauges for the mean sampled
+        render time (in milliseconds) and each cache's hit rate
+        """
+        lines = [
+            f"{prefix}.renders:{self.renders}|c",
+            f"{prefix}.output_chars:{self.output_chars}|c",
+            f"{prefix}.output_bytes:{self.output_bytes}|c",
+            f"{prefix}.escapes:{self.escapes}|c",
+        ]
+        if self.sampled:
+            lines.append(f"{prefix}.render_time_ms:{self.sampled_seconds / self.sampled * 1000:.3f}|g")
+        for name in self.caches:
+            rate = self.hit_rate(name)
+            if rate is not None:
+                lines.append(f"{prefix}.cache.{_statsd_name(name)}.hit_rate:{rate:.4f}|g")
+        return lines
+
+    def __repr__(self) -> str:
+        return (
+            f"MetricsSnapshot(renders={self.renders!r}, output_chars={self.output_chars!r}, "
+            f"output_bytes={self.output_bytes!r}, "
+            f"escapes={self.escapes!r}, sampled={self.sampled!r}, caches={self.caches!r})"
+        )
+
+
+def _label_value(s: str) -> str:
+    return s.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _statsd_name(s: str) -> str:
+    # `:`, `|` and `@` are part of the line format
+    return "".join([c if c.isalnum() or c in "_-." else "_" for c in s])
+
+
+def enable_metrics(sample_every: int = 100) -> None:
+    """
+    Start counting renders, output and escapes, and timing one in every `sample_every`
+    renders on each thread (or none, if it's 0). The counters are kept per thread, so
+    updating them doesn't need a lock; they cost a few attribute updates per render,
+    plus one per string that needs escaping. With metrics disabled (the default), the
+    cost is one check per render.
+    """
+    _metrics.sample_every = sample_every
+    _metrics.enabled = True
+
+
+def disable_metrics() -> None:
+    """
+    stop updating the metrics. Their values are kept until they're reset
+    """
+    _metrics.enabled = False
+
+
+def metrics_snapshot() -> MetricsSnapshot:
+    """
+    The metrics so far, added up over all threads. It's cheap enough to call on every
+    scrape. Counters are read without stopping renders in progress on other threads, so
+    a render may be counted in one field but not yet in another.
+    """
+    renders = output_chars = output_bytes = escapes = sampled = 0
+    sampled_seconds = 0.0
+    buckets = [0] * (len(RENDER_TIME_BUCKETS) + 1)
+    with _all_counters_lock:
+        all_counters = list(_all_counters.values())
+    for counters in all_counters:
+        renders += counters.renders
+        output_chars += counters.output_chars
+        output_bytes += counters.output_bytes
+        escapes += counters.escapes
+        sampled += counters.sampled
+        sampled_seconds += counters.sampled_seconds
+        for i, count in enumerate(counters.buckets):
+            buckets[i] += count
+
+    caches = {}
+    for name, (hits, misses) in _current_cache_stats().items():
+        baseline_hits, baseline_misses = _cache_baselines.get(name, (0, 0))
+        caches[name] = (hits - baseline_hits, misses - baseline_misses)
+
+    return MetricsSnapshot(
+        time.time(), renders, output_chars, output_bytes, escapes, sampled, sampled_seconds, tuple(buckets), caches
+    )
+
+
+def reset_metrics() -> None:
+    """
+    set the metrics back to zero. Caches themselves are left as they are
+    """
+    with _all_counters_lock:
+        for counters in _all_counters.values():
+            counters.reset()
+    _cache_baselines.update(_current_cache_stats())
@@ -0,0 +1,99 @@
+import os
+from concurrent.futures import Executor, ThreadPoolExecutor
+from types import GeneratorType
+from typing import Optional
+
+from simple_html.core import Node, SafeString, _metrics, _render, _thread_counters
+
+
+def _split(nodes: list[Node], min_parts: int) -> list[Node]:
+    """
+    Expand tuples, lists and generators breadth-first until there are at least `min_parts`
+    sibling nodes (or nothing is left to expand). Rendering the result in order is
+    equivalent to rendering `nodes`.
+    """
+    parts = nodes
+    while len(parts) < min_parts:
+        expanded: list[Node] = []
+        changed = False
+        for node in parts:
+            if type(node) is tuple:
+                expanded.append(SafeString(node[0]))
+                expanded.extend(node[1])
+                expanded.append(SafeString(node[2]))
+                changed = True
+            elif type(node) is list or type(node) is GeneratorType:
+                # generators are consumed here, on the calling thread, so no generator is
+                # ever shared between threads
+                expanded.extend(node)
+                changed = True
+            else:
+                expanded.append(node)
+        if not changed:
+            break
+        parts = expanded
+    return parts
+
+
+def _render_group(group: list[Node]) -> str:
+    results: list[str] = []
+    if not _metrics.enabled:
+        _render(group, results.append)
+        return "".join(results)
+
+    # the group is part of the render on the calling thread, so renders inside it (e.g. of
+    # cached components) aren't counted as renders on this one
+    counters = _thread_counters()
+    counters.start(False)
+    try:
+        _render(group, results.append)
+    finally:
+        counters.abandon()
+    return "".join(results)
+
+
+def render_parallel(
+    *nodes: Node, executor: Optional[Executor] = None, tasks: Optional[int] = None
+) -> str:
+    """
+    Render independent sibling subtrees on a thread pool and join the results in order.
+    The output is identical to `render(*nodes)`.
+
+    This only helps on free-threaded (no-GIL) builds of CPython; with the GIL enabled it
+    is slower than `render`. `Tag` and `SafeString` objects are immutable once created, so
+    the same `Tag`s and prerendered content can be used from any number of threads.
+    Generators are always consumed by a single thread. Rendering does update some shared
+    state -- the renderer table (for types it hasn't seen yet), the attribute name cache,
+    `adaptive` components' caches and `ExtractedStyles` -- but all of it is safe to update
+    from several threads at once, and metrics counters are kept per thread.
+
+    If no `executor` is given, a `ThreadPoolExecutor` is created for the call. `tasks` is
+    the number of groups the tree is split into; it defaults to four per CPU.
+    """
+    if _metrics.enabled:
+        counters = _thread_counters()
+        start = counters.start(True)
+        try:
+            html = _render_parallel(nodes, executor, tasks)
+        except BaseException:
+            counters.abandon()
+            raise
+        counters.finish(start, len(html), 0)
+        return html
+    return _render_parallel(nodes, executor, tasks)
+
+
+def _render_parallel(nodes: tuple[Node, ...], executor: Optional[Executor], tasks: Optional[int]) -> str:
+    if tasks is None:
+        tasks = 4 * (os.cpu_count() or 1)
+
+    parts = _split(list(nodes), tasks)
+    if not parts:
+        return ""
+    group_size = -(-len(parts) // tasks)  # ceiling division
+    groups = [parts[i:i + group_size] for i in range(0, len(parts), group_size)]
+
+    if executor is None:
+        with ThreadPoolExecutor() as pool:
+            return "".join(pool.map(_render_group, groups))
+    return "".join(executor.map(_render_group, groups))
@@ -0,0 +1,121 @@
+import re
+from html import unescape
+from types import GeneratorType
+from typing import Callable, Final, Iterable, Optional
+
+from simple_html.core import Component, Lazy, Node, _render
+
+_ID_ATTR: Final = re.compile(r'\sid="([^"]*)"')
+
+# stands in for keyed children in their parent's shape; `\x00` can't be in an id
+_PLACEHOLDER: Final[str] = "\x00{}\x00"
+
+Patch = tuple[Optional[str], str]
+
+
+class _Keyed:
+    __slots__ = ("shape", "html", "parent")
+
+    def __init__(self, shape: str, html: str, parent: Optional[str]) -> None:
+        self.shape = shape
+        self.html = html
+        self.parent = parent
+
+
+def _walk(
+    nodes: Iterable[Node],
+    append_html: Callable[[str], None],
+    append_shape: Callable[[str], None],
+    parent: Optional[str],
+    keyed: dict[str, _Keyed],
+) -> None:
+    for node in nodes:
+        if type(node) is tuple:
+            m = _ID_ATTR.search(node[0])
+            if m is None:
+                append_html(node[0])
+                append_shape(node[0])
+                _walk(node[1], append_html, append_shape, parent, keyed)
+                append_html(node[2])
+                append_shape(node[2])
+            else:
+                key = unescape(m.group(1))
+                # added before its children, so `keyed` is in document order
+                entry = _Keyed("", "", parent)
+                keyed[key] = entry
+                html: list[str] = [node[0]]
+                shape: list[str] = [node[0]]
+                _walk(node[1], html.append, shape.append, key, keyed)
+                html.append(node[2])
+                shape.append(node[2])
+                entry.html = "".join(html)
+                entry.shape = "".join(shape)
+                append_html(entry.html)
+                append_shape(_PLACEHOLDER.format(key))
+        elif type(node) is list or type(node) is GeneratorType:
+            _walk(node, append_html, append_shape, parent, keyed)
+        elif type(node) is Lazy:
+            _walk((node.thunk(),), append_html, append_shape, parent, keyed)
+        elif type(node) is Component:
+            _walk(node.children, append_html, append_shape, parent, keyed)
+        else:
+            leaf: list[str] = []
+            _render((node,), leaf.append)
+            rendered = "".join(leaf)
+            append_html(rendered)
+            append_shape(rendered)
+
+
+class PatchRenderer:
+    """
+    Renders successive versions of a tree, e.g. a live dashboard panel, as patches
+    against the previous version. Elements are keyed by their `id` attribute, which must
+    be unique. Each update returns `(id, html)` pairs: replace the element with that id
+    with `html` (its new outer HTML). Only the outermost changed keyed elements are
+    included, so an element whose own content is unchanged isn't resent because one of
+    its keyed descendants changed. An `id` of `None` means the whole output changed
+    outside of any keyed element (as on the first update); `html` is then the full
+    output.
+
+    Only elements with children can be keyed; elements without children are prerendered
+    to `SafeString`s when they're created.
+    """
+    __slots__ = ("_shape", "_shapes")
+
+    def __init__(self) -> None:
+        self._shape: Optional[str] = None
+        self._shapes: dict[str, str] = {}
+
+    def update(self, *nodes: Node) -> list[Patch]:
+        html: list[str] = []
+        shape: list[str] = []
+        keyed: dict[str, _Keyed] = {}
+        _walk(nodes, html.append, shape.append, None, keyed)
+
+        root_shape = "".join(shape)
+        previous_root_shape = self._shape
+        previous_shapes = self._shapes
+        self._shape = root_shape
+        self._shapes = {key: k.shape for key, k in keyed.items()}
+
+        if root_shape != previous_root_shape:
+            return [(None, "".join(html))]
+
+        changed = {key for key, k in keyed.items() if previous_shapes.get(key) != k.shape}
+        patches: list[Patch] = []
+        for key in keyed:
+            if key not in changed:
+                continue
+            parent = keyed[key].parent
+            while parent is not None and parent not in changed:
+                parent = keyed[parent].parent
+            if parent is None:
+                patches.append((key, keyed[key].html))
+        return patches
+
+    def reset(self) -> None:
+        """
+        forget the previous version, e.g. when a client reconnects
+        """
+        self._shape = None
+        self._shapes = {}
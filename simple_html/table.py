@@ -0,0 +1,83 @@
+from decimal import Decimal
+from typing import Any, Iterable, Mapping, Optional, Sequence, Union
+
+from simple_html.core import SafeString, Tag, _render_to_str, escape_many
+
+_table = Tag("table")
+
+# rows can be any iterable of row sequences, a mapping of column name to column values, or
+# a NumPy array (2d, or a mapping of 1d arrays). NumPy is never imported here; arrays are
+# recognized by their `tolist` method.
+TableRows = Union[Iterable[Sequence[Any]], Mapping[str, Any], Any]
+
+
+def _to_list(values: Any) -> list[Any]:
+    if hasattr(values, "tolist"):
+        # NumPy arrays convert to python objects in a single C-level call
+        return list(values.tolist())
+    return list(values)
+
+
+def _render_column(values: list[Any]) -> list[str]:
+    """
+    Render a whole column at once. Columns of plain `str`s are escaped in bulk, numeric
+    columns are formatted with a single `map`, and anything else falls back to `render`
+    per cell.
+    """
+    all_str = True
+    all_numeric = True
+    for v in values:
+        t = type(v)
+        if t is not str:
+            all_str = False
+        if t is not int and t is not float and t is not Decimal:
+            all_numeric = False
+        if not all_str and not all_numeric:
+            return [_render_to_str((v,), None, None) for v in values]
+
+    if all_str:
+        return escape_many(values)
+    return list(map(str, values))
+
+
+def render_table(
+    columns: Sequence[str],
+    rows: TableRows,
+    attrs: Optional[dict[Union[SafeString, str], Union[str, SafeString, int, float, Decimal, None]]] = None,
+) -> SafeString:
+    """
+    Render a `<table>` with a header row of `columns` and one row per item in `rows`,
+    without building a `TagTuple` for every cell. Cells are rendered as they would be by
+    `render`: `str`s are escaped, numbers formatted and other `Node`s rendered normally.
+    """
+    data: list[list[Any]]
+    if isinstance(rows, Mapping):
+        data = [_to_list(rows[c]) for c in columns]
+        for column, values in zip(columns, data):
+            if len(values) != len(data[0]):
+                raise ValueError(
+                    f"Expected {len(data[0])} values in column {column!r}, got {len(values)}"
+                )
+    else:
+        row_list = _to_list(rows)
+        for i, row in enumerate(row_list):
+            if len(row) != len(columns):
+                raise ValueError(f"Expected {len(columns)} cells in row {i}, got {len(row)}")
+        if row_list:
+            data = [list(col) for col in zip(*row_list)]
+        else:
+            data = [[] for _ in columns]
+
+    if len(data) != len(columns):
+        raise ValueError(f"Expected {len(columns)} columns, got {len(data)}")
+
+    rendered_columns = [_render_column(col) for col in data]
+    header = "</th><th>".join(escape_many(list(columns)))
+
+    body = "".join(
+        [f"<tr><td>{'</td><td>'.join(row)}</td></tr>" for row in zip(*rendered_columns)]
+    )
+
+    # not counted as a render by metrics; it's part of building the tree
+    table = _table(attrs or {}, SafeString(f"<thead><tr><th>{header}</th></tr></thead><tbody>{body}</tbody>"))
+    return SafeString(_render_to_str((table,), None, None))
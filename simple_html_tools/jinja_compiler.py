@@ -0,0 +1,538 @@
+"""
+Compile Jinja templates to Python functions that build simple_html `Node`s.
+
+Requires jinja2, whose parser is used to read the templates. The supported subset is
+output expressions, `if`, `for` (including `loop.index` etc. and `else`), `set`,
+`block`/`extends` (without `super()`), `include` of constant template names, and `range`.
+`safe` and `escape` are only supported as the last filter of an output expression.
+Static template text is emitted as module-level `SafeString` constants.
+"""
+import keyword
+import re
+from typing import Any, Callable, Final, Iterable, Optional
+
+from simple_html.core import faster_escape
+
+try:
+    from jinja2 import Environment, nodes
+except ImportError as e:  # pragma: no cover
+    raise ImportError("simple_html_tools.jinja_compiler requires jinja2 to be installed") from e
+
+
+class UnsupportedJinjaFeature(ValueError):
+    pass
+
+
+_BIN_OPS: Final[dict[type, str]] = {
+    nodes.Add: "+",
+    nodes.Sub: "-",
+    nodes.Mul: "*",
+    nodes.Div: "/",
+    nodes.FloorDiv: "//",
+    nodes.Mod: "%",
+    nodes.Pow: "**",
+    nodes.And: "and",
+    nodes.Or: "or",
+}
+
+_COMPARE_OPS: Final[dict[str, str]] = {
+    "eq": "==",
+    "ne": "!=",
+    "gt": ">",
+    "gteq": ">=",
+    "lt": "<",
+    "lteq": "<=",
+    "in": "in",
+    "notin": "not in",
+}
+
+# filters whose output is markup. Their output is only supported as the whole of an
+# output expression: unlike Jinja's `Markup`, a `SafeString` isn't a `str`
+_MARKUP_FILTERS: Final[dict[str, Callable[[str], str]]] = {
+    "e": lambda v: f"SafeString(faster_escape(str({v})))",
+    "escape": lambda v: f"SafeString(faster_escape(str({v})))",
+    "safe": lambda v: f"SafeString(str({v}))",
+}
+
+# filters that are a function of the value only
+_SIMPLE_FILTERS: Final[dict[str, Callable[[str], str]]] = {
+    "string": lambda v: f"str({v})",
+    "length": lambda v: f"len({v})",
+    "count": lambda v: f"len({v})",
+    "upper": lambda v: f"str({v}).upper()",
+    "lower": lambda v: f"str({v}).lower()",
+    "title": lambda v: f"str({v}).title()",
+    "capitalize": lambda v: f"str({v}).capitalize()",
+    "trim": lambda v: f"str({v}).strip()",
+    "int": lambda v: f"int({v})",
+    "float": lambda v: f"float({v})",
+    "abs": lambda v: f"abs({v})",
+    "first": lambda v: f"next(iter({v}))",
+    "last": lambda v: f"list({v})[-1]",
+    "list": lambda v: f"list({v})",
+}
+
+_TESTS: Final[dict[str, str]] = {
+    "none": "{} is None",
+    "even": "{} % 2 == 0",
+    "odd": "{} % 2 == 1",
+    "divisibleby": "{} % {} == 0",
+    "eq": "{} == {}",
+    "ne": "{} != {}",
+}
+
+
+# names that may be used without being template variables
+_BUILTIN_NAMES: Final[frozenset[str]] = frozenset(["range"])
+
+# names with a special meaning in Jinja, besides its globals
+_SPECIAL_NAMES: Final[frozenset[str]] = frozenset(["super", "self", "caller", "varargs", "kwargs"])
+
+
+def _function_name(template_name: str) -> str:
+    name = re.sub(r"\W", "_", template_name.rsplit(".", 1)[0]).strip("_")
+    if not name or name[0].isdigit() or keyword.iskeyword(name):
+        name = "template_" + name
+    return name
+
+
+class _Scope:
+    """
+    The names bound (by `set` or a `for` target) in a Jinja scope -- a template, loop
+    body, block or included template -- mapped to the Python variables that hold them.
+    Python has no block scopes, so each gets its own variable.
+    """
+    __slots__ = ("names", "start", "indent", "conditional")
+
+    def __init__(self, start: int, indent: int) -> None:
+        self.names: dict[str, str] = {}
+        # where the scope's code starts in `lines`, and its indent
+        self.start = start
+        self.indent = indent
+        # how many `if`s the code being compiled is nested in (they don't start a scope)
+        self.conditional = 0
+
+
+class _Loop:
+    __slots__ = ("index_var", "items_var")
+
+    def __init__(self, index_var: str, items_var: str) -> None:
+        self.index_var = index_var
+        self.items_var = items_var
+
+
+class _TemplateCompiler:
+    """
+    Compiles one template (with everything it extends and includes inlined) into the
+    source of a single function.
+    """
+
+    def __init__(self, env: Environment, constants: dict[str, str], autoescape: bool) -> None:
+        self.env = env
+        # static html -> constant name; shared between templates in a module
+        self.constants = constants
+        self.autoescape = autoescape
+        self.lines: list[str] = []
+        self.params: list[str] = []
+        # params used other than as the value of a `default` filter
+        self.required: set[str] = set()
+        self.scopes: list[_Scope] = [_Scope(0, 1)]
+        # index in `scopes` of the current template's scope, for its blocks
+        self.template_scope = 0
+        # the templates being compiled, to reject includes and extends that form a cycle
+        self.active: list[str] = []
+        self.loops: list[_Loop] = []
+        # block name -> the body to render for it
+        self.blocks: dict[str, list[nodes.Node]] = {}
+        self.pending_static: list[str] = []
+        self.counter = 0
+
+    # -- statements --
+
+    def compile_template(self, template_name: str, function_name: str, types: dict[str, str]) -> str:
+        self.body(self.resolve_inheritance(template_name, self.blocks), 1)
+        self.flush(1)
+
+        params = ", ".join([self.param(p, types.get(p)) for p in self.params])
+        header = f"def {function_name}(*, {params}) -> Node:" if params else f"def {function_name}() -> Node:"
+        return "\n".join([header, "    _out: list[Node] = []", *self.lines, "    return _out"])
+
+    def param(self, name: str, annotation: Optional[str]) -> str:
+        if name in self.required:
+            return f"{name}: {annotation or 'Any'}"
+        # only used with a default, which applies if it's left out
+        return f"{name}: {f'Optional[{annotation}]' if annotation else 'Any'} = None"
+
+    def resolve_inheritance(
+        self, template_name: str, overrides: dict[str, list[nodes.Node]]
+    ) -> list[nodes.Node]:
+        """
+        Collect the blocks of `template_name` and every template it extends into
+        `overrides`, and return the body of the root template. The templates are added to
+        `active`; the caller removes them once the body is compiled.
+        """
+        if template_name in self.active:
+            raise UnsupportedJinjaFeature(f"{template_name!r} includes or extends itself")
+        self.active.append(template_name)
+        template = self.parse(template_name)
+
+        # blocks closest to the template being compiled take precedence
+        for block in template.find_all(nodes.Block):
+            if block.scoped or block.required:
+                raise UnsupportedJinjaFeature("scoped and required blocks are not supported")
+            overrides.setdefault(block.name, block.body)
+
+        extends = next(iter(template.find_all(nodes.Extends)), None)
+        if extends is None:
+            return template.body
+
+        if not isinstance(extends.template, nodes.Const):
+            raise UnsupportedJinjaFeature("`extends` must use a constant template name")
+        return self.resolve_inheritance(extends.template.value, overrides)
+
+    def parse(self, template_name: str) -> nodes.Template:
+        assert self.env.loader is not None
+        source, _, _ = self.env.loader.get_source(self.env, template_name)
+        return self.env.parse(source, template_name)
+
+    def emit(self, line: str, indent: int) -> None:
+        self.lines.append("    " * indent + line)
+
+    def flush(self, indent: int) -> None:
+        if self.pending_static:
+            html = "".join(self.pending_static)
+            self.pending_static = []
+            if html:
+                const = self.constants.get(html)
+                if const is None:
+                    const = f"_S{len(self.constants)}"
+                    self.constants[html] = const
+                self.emit(f"_out.append({const})", indent)
+
+    def fresh(self, prefix: str) -> str:
+        self.counter += 1
+        return f"_{prefix}{self.counter}"
+
+    def body(self, body: Iterable[nodes.Node], indent: int) -> None:
+        for node in body:
+            self.statement(node, indent)
+
+    def block_body(self, body: list[nodes.Node], indent: int) -> None:
+        line_count = len(self.lines)
+        self.body(body, indent)
+        self.flush(indent)
+        if len(self.lines) == line_count:
+            self.emit("pass", indent)
+
+    def statement(self, node: nodes.Node, indent: int) -> None:
+        if isinstance(node, nodes.Output):
+            for child in node.nodes:
+                if isinstance(child, nodes.TemplateData):
+                    self.pending_static.append(child.data)
+                elif isinstance(child, nodes.Const):
+                    value = str(child.value)
+                    self.pending_static.append(faster_escape(value) if self.autoescape else value)
+                else:
+                    self.flush(indent)
+                    if isinstance(child, nodes.Filter) and child.name in _MARKUP_FILTERS:
+                        expr = self.markup_filter(child)
+                    else:
+                        expr = self.expr(child)
+                        if not self.autoescape:
+                            expr = f"SafeString(str({expr}))"
+                    self.emit(f"_out.append({expr})", indent)
+        elif isinstance(node, nodes.If):
+            self.flush(indent)
+            self.emit(f"if {self.expr(node.test)}:", indent)
+            scope = self.scopes[-1]
+            scope.conditional += 1
+            self.block_body(node.body, indent + 1)
+            for elif_ in node.elif_:
+                self.emit(f"elif {self.expr(elif_.test)}:", indent)
+                self.block_body(elif_.body, indent + 1)
+            if node.else_:
+                self.emit("else:", indent)
+                self.block_body(node.else_, indent + 1)
+            scope.conditional -= 1
+        elif isinstance(node, nodes.For):
+            self.for_loop(node, indent)
+        elif isinstance(node, nodes.Assign):
+            self.flush(indent)
+            # the value is evaluated before the name is bound, e.g. in `set x = x + 1`
+            value = self.expr(node.node)
+            self.emit(f"{self.target(node.target)} = {value}", indent)
+        elif isinstance(node, nodes.Include):
+            if not isinstance(node.template, nodes.Const):
+                raise UnsupportedJinjaFeature("`include` must use a constant template name")
+            # included templates have their own blocks and scope, and see the variables
+            # where they're included
+            self.flush(indent)
+            outer_blocks, outer_template_scope, active = self.blocks, self.template_scope, len(self.active)
+            self.blocks = {}
+            self.scopes.append(_Scope(len(self.lines), indent))
+            self.template_scope = len(self.scopes) - 1
+            self.body(self.resolve_inheritance(node.template.value, self.blocks), indent)
+            self.flush(indent)
+            self.scopes.pop()
+            self.blocks, self.template_scope = outer_blocks, outer_template_scope
+            del self.active[active:]
+        elif isinstance(node, nodes.Block):
+            # blocks have their own scope, and only see their template's variables (not
+            # those of loops they're in)
+            self.flush(indent)
+            outer_scopes = self.scopes
+            self.scopes = [*self.scopes[: self.template_scope + 1], _Scope(len(self.lines), indent)]
+            self.body(self.blocks.get(node.name, node.body), indent)
+            self.flush(indent)
+            self.scopes = outer_scopes
+        elif isinstance(node, nodes.Extends):
+            pass
+        else:
+            raise UnsupportedJinjaFeature(f"{type(node).__name__} is not supported")
+
+    def for_loop(self, node: nodes.For, indent: int) -> None:
+        if node.recursive:
+            raise UnsupportedJinjaFeature("recursive loops are not supported")
+        self.flush(indent)
+
+        iterable = self.expr(node.iter)
+        items = self.fresh("items")
+        index = self.fresh("i")
+        # the target is only bound inside the loop, where it hides a variable of the same name
+        scope = _Scope(0, indent + 1)
+        self.scopes.append(scope)
+        target = self.target(node.target)
+        if node.test is not None:
+            iterable = f"[{target} for {target} in {iterable} if {self.expr(node.test)}]"
+
+        self.emit(f"{items} = list({iterable})", indent)
+        self.emit(f"for {index}, {target} in enumerate({items}):", indent)
+        scope.start = len(self.lines)
+        self.loops.append(_Loop(index, items))
+        self.block_body(node.body, indent + 1)
+        self.loops.pop()
+        self.scopes.pop()
+        if node.else_:
+            self.emit(f"if not {items}:", indent)
+            self.scopes.append(_Scope(len(self.lines), indent + 1))
+            self.block_body(node.else_, indent + 1)
+            self.scopes.pop()
+
+    def target(self, node: nodes.Node) -> str:
+        if isinstance(node, nodes.Name):
+            return self.bind(node.name)
+        if isinstance(node, nodes.Tuple):
+            return "(" + ", ".join([self.target(item) for item in node.items]) + ",)"
+        raise UnsupportedJinjaFeature(f"can't assign to {type(node).__name__}")
+
+    def bind(self, name: str) -> str:
+        """
+        the Python variable for `name` in the current scope
+        """
+        self.check_name(name)
+        scope = self.scopes[-1]
+        variable = scope.names.get(name)
+        if variable is None:
+            variable = self.fresh(name + "_")
+            if scope.conditional:
+                # after an `if` that sets it, the name has either the value it was set to
+                # or the one it had outside of this scope
+                outer = self.variable(name, len(self.scopes) - 1, False)
+                self.lines.insert(scope.start, "    " * scope.indent + f"{variable} = {outer}")
+            scope.names[name] = variable
+        return variable
+
+    def lookup(self, name: str, depth: int) -> Optional[str]:
+        """
+        the Python variable for `name` if it's bound in one of the first `depth` scopes
+        """
+        for scope in reversed(self.scopes[:depth]):
+            variable = scope.names.get(name)
+            if variable is not None:
+                return variable
+        return None
+
+    def variable(self, name: str, depth: int, optional: bool) -> str:
+        """
+        the Python expression for a variable, looked up in the first `depth` scopes and
+        otherwise taken as a parameter (which `optional` ones needn't be passed)
+        """
+        variable = self.lookup(name, depth)
+        if variable is not None:
+            return variable
+        if name == "loop":
+            raise UnsupportedJinjaFeature("`loop` is only supported as `loop.<attribute>`")
+        if name in _BUILTIN_NAMES:
+            return name
+        if name in _SPECIAL_NAMES or name in self.env.globals:
+            raise UnsupportedJinjaFeature(f"`{name}` is not supported")
+        if name not in self.params:
+            self.check_name(name)
+            self.params.append(name)
+        if not optional:
+            self.required.add(name)
+        return name
+
+    def check_name(self, name: str) -> None:
+        if keyword.iskeyword(name) or name.startswith("_") or name in ("Node", "SafeString", "Any"):
+            raise UnsupportedJinjaFeature(f"variable name {name!r} is not supported")
+
+    # -- expressions --
+
+    def expr(self, node: nodes.Node) -> str:
+        if isinstance(node, nodes.Const):
+            return repr(node.value)
+        if isinstance(node, nodes.Name):
+            return self.variable(node.name, len(self.scopes), False)
+        if isinstance(node, nodes.Getattr):
+            if (
+                isinstance(node.node, nodes.Name)
+                and node.node.name == "loop"
+                and self.lookup("loop", len(self.scopes)) is None
+            ):
+                return self.loop_attribute(node.attr)
+            return f"{self.expr(node.node)}.{node.attr}"
+        if isinstance(node, nodes.Getitem):
+            return f"{self.expr(node.node)}[{self.expr(node.arg)}]"
+        if isinstance(node, nodes.Slice):
+            bounds = [node.start, node.stop, node.step]
+            return ":".join(["" if b is None else self.expr(b) for b in bounds])
+        if isinstance(node, nodes.Filter):
+            return self.filter(node)
+        if isinstance(node, nodes.Test):
+            return self.test(node)
+        if isinstance(node, nodes.Not):
+            return f"(not {self.expr(node.node)})"
+        if isinstance(node, nodes.Neg):
+            return f"(-{self.expr(node.node)})"
+        if isinstance(node, nodes.Pos):
+            return f"(+{self.expr(node.node)})"
+        if isinstance(node, nodes.Concat):
+            return "".join(["(", " + ".join([f"str({self.expr(n)})" for n in node.nodes]), ")"])
+        if isinstance(node, nodes.Compare):
+            parts = [self.expr(node.expr)]
+            for operand in node.ops:
+                parts.append(_COMPARE_OPS[operand.op])
+                parts.append(self.expr(operand.expr))
+            return "(" + " ".join(parts) + ")"
+        if isinstance(node, nodes.CondExpr):
+            else_ = "''" if node.expr2 is None else self.expr(node.expr2)
+            return f"({self.expr(node.expr1)} if {self.expr(node.test)} else {else_})"
+        if isinstance(node, nodes.List):
+            return "[" + ", ".join([self.expr(item) for item in node.items]) + "]"
+        if isinstance(node, nodes.Tuple):
+            return "(" + ", ".join([self.expr(item) for item in node.items]) + ",)"
+        if isinstance(node, nodes.Dict):
+            return "{" + ", ".join([f"{self.expr(p.key)}: {self.expr(p.value)}" for p in node.items]) + "}"
+        if isinstance(node, nodes.Call):
+            if node.dyn_args is not None or node.dyn_kwargs is not None:
+                raise UnsupportedJinjaFeature("`*args` and `**kwargs` in calls are not supported")
+            return f"{self.expr(node.node)}({self.arguments(node.args, node.kwargs)})"
+        op = _BIN_OPS.get(type(node))
+        if op is not None:
+            assert isinstance(node, nodes.BinExpr)
+            return f"({self.expr(node.left)} {op} {self.expr(node.right)})"
+        raise UnsupportedJinjaFeature(f"{type(node).__name__} expressions are not supported")
+
+    def arguments(self, args: list[nodes.Expr], kwargs: list[nodes.Keyword]) -> str:
+        return ", ".join([self.expr(a) for a in args] + [f"{k.key}={self.expr(k.value)}" for k in kwargs])
+
+    def loop_attribute(self, attr: str) -> str:
+        if not self.loops:
+            raise UnsupportedJinjaFeature("`loop` used outside of a loop")
+        loop = self.loops[-1]
+        if attr == "index":
+            return f"({loop.index_var} + 1)"
+        if attr == "index0":
+            return loop.index_var
+        if attr == "revindex":
+            return f"(len({loop.items_var}) - {loop.index_var})"
+        if attr == "revindex0":
+            return f"(len({loop.items_var}) - {loop.index_var} - 1)"
+        if attr == "first":
+            return f"({loop.index_var} == 0)"
+        if attr == "last":
+            return f"({loop.index_var} == len({loop.items_var}) - 1)"
+        if attr == "length":
+            return f"len({loop.items_var})"
+        raise UnsupportedJinjaFeature(f"`loop.{attr}` is not supported")
+
+    def markup_filter(self, node: nodes.Filter) -> str:
+        if node.node is None or node.args or node.kwargs:
+            raise UnsupportedJinjaFeature(f"this use of the `{node.name}` filter is not supported")
+        return _MARKUP_FILTERS[node.name](self.expr(node.node))
+
+    def filter(self, node: nodes.Filter) -> str:
+        if node.node is None:
+            raise UnsupportedJinjaFeature("filter blocks are not supported")
+        if node.name in _MARKUP_FILTERS:
+            raise UnsupportedJinjaFeature(
+                f"the `{node.name}` filter is only supported as the last filter of an output expression"
+            )
+        if node.name in ("default", "d") and isinstance(node.node, nodes.Name):
+            value = self.variable(node.node.name, len(self.scopes), True)
+        else:
+            value = self.expr(node.node)
+        simple = _SIMPLE_FILTERS.get(node.name)
+        if simple is not None and not node.args and not node.kwargs:
+            return simple(value)
+        if node.name in ("default", "d") and len(node.args) <= 1:
+            default = self.expr(node.args[0]) if node.args else "''"
+            return f"({value} if {value} is not None else {default})"
+        if node.name == "join" and len(node.args) <= 1:
+            separator = self.expr(node.args[0]) if node.args else "''"
+            return f"str({separator}).join([str(_v) for _v in {value}])"
+        # only the default method, which is Python's `round`
+        if node.name == "round" and len(node.args) <= 1 and not node.kwargs:
+            return f"round({value}, {self.expr(node.args[0]) if node.args else '0'})"
+        raise UnsupportedJinjaFeature(f"the `{node.name}` filter is not supported")
+
+    def test(self, node: nodes.Test) -> str:
+        template = _TESTS.get(node.name)
+        if template is None or node.kwargs or template.count("{}") != len(node.args) + 1:
+            raise UnsupportedJinjaFeature(f"the `{node.name}` test is not supported")
+        return "(" + template.format(self.expr(node.node), *[self.expr(a) for a in node.args]) + ")"
+
+
+def compile_templates(
+    env: Environment,
+    template_names: Iterable[str],
+    types: Optional[dict[str, str]] = None,
+) -> str:
+    """
+    Return the source of a Python module with one function per template, named after the
+    template (e.g. `pages/home.html` -> `pages_home`). Each function takes the template's
+    variables as keyword arguments and returns a `Node`; variables only used with the
+    `default` filter can be left out. Template variables are annotated with `Any`, unless
+    `types` maps their name to an annotation. Variables set with `set` or by `for` are
+    scoped as in Jinja, e.g. a loop variable isn't visible after the loop.
+
+    Output expressions become children, so they must be valid `Node`s -- unlike in
+    Jinja, e.g. `None` is not rendered as "None". Attribute access is plain Python
+    attribute access (Jinja falls back to item lookup).
+
+    Raises `UnsupportedJinjaFeature` for anything outside the supported subset.
+    """
+    constants: dict[str, str] = {}
+    functions: list[str] = []
+    for template_name in template_names:
+        autoescape: Any = env.autoescape
+        if callable(autoescape):
+            autoescape = autoescape(template_name)
+
+        compiler = _TemplateCompiler(env, constants, bool(autoescape))
+        functions.append(compiler.compile_template(template_name, _function_name(template_name), types or {}))
+
+    return "\n".join(
+        [
+            "# generated by simple_html_tools.jinja_compiler -- edit the templates instead",
+            "from typing import Any, Optional",
+            "",
+            "from simple_html import Node, SafeString",
+            "from simple_html.core import faster_escape",
+            "",
+            *[f"{name} = SafeString({html!r})" for html, name in constants.items()],
+            "",
+            *[f"\n{f}\n" for f in functions],
+        ]
+    )
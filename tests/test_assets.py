@@ -0,0 +1,115 @@
+from simple_html import (
+    Node,
+    adaptive,
+    lazy,
+    asset,
+    asset_slot,
+    body,
+    div,
+    head,
+    html,
+    link,
+    p,
+    render,
+    render_with_assets,
+    script,
+    stream_with_assets,
+    title,
+)
+
+_CSS = link({"rel": "stylesheet", "href": "/widget.css"})
+_JS = script({"src": "/widget.js"})
+
+
+def _widget(i: int) -> Node:
+    return div({"class": "widget"}, asset(_CSS), asset(_JS, slot="body"), p(f"widget {i}"))
+
+
+def _page() -> Node:
+    return html(
+        head(title("assets"), asset_slot("head")),
+        body([_widget(i) for i in range(3)], asset_slot("body")),
+    )
+
+
+_WIDGETS = "".join(f'<div class="widget"><p>widget {i}</p></div>' for i in range(3))
+
+
+def test_render_with_assets() -> None:
+    assert render_with_assets(_page()) == (
+        '<html><head><title>assets</title><link rel="stylesheet" href="/widget.css"/></head>'
+        f'<body>{_WIDGETS}<script src="/widget.js"></script></body></html>'
+    )
+
+
+def test_assets_without_slots_go_at_the_end() -> None:
+    assert render_with_assets(div(_widget(0), _widget(1))) == (
+        '<div><div class="widget"><p>widget 0</p></div><div class="widget"><p>widget 1</p></div></div>'
+        '<link rel="stylesheet" href="/widget.css"/><script src="/widget.js"></script>'
+    )
+
+
+def test_plain_render_keeps_assets_in_place() -> None:
+    assert render(_widget(0)) == (
+        '<div class="widget"><link rel="stylesheet" href="/widget.css"/>'
+        '<script src="/widget.js"></script><p>widget 0</p></div>'
+    )
+
+
+def test_stream_with_assets() -> None:
+    streamed = b"".join(stream_with_assets(_page(), chunk_size=16)).decode()
+
+    # the stylesheet is only declared after the head slot was streamed, so it moves to the
+    # body slot
+    assert streamed == (
+        "<html><head><title>assets</title></head>"
+        f'<body>{_WIDGETS}<link rel="stylesheet" href="/widget.css"/><script src="/widget.js"></script>'
+        "</body></html>"
+    )
+
+    page = html(head(asset(_CSS), asset_slot("head")), body(_widget(0), asset_slot("body")))
+    assert b"".join(stream_with_assets(page)).decode() == render_with_assets(page)
+
+
+def test_interleaved_streams() -> None:
+    first = stream_with_assets(_page(), chunk_size=1)
+    second = stream_with_assets(_page(), chunk_size=1)
+    chunks: tuple[list[bytes], list[bytes]] = ([], [])
+    for a, b in zip(first, second):
+        chunks[0].append(a)
+        chunks[1].append(b)
+    chunks[0].extend(first)
+    chunks[1].extend(second)
+
+    assert b"".join(chunks[0]) == b"".join(chunks[1]) == b"".join(stream_with_assets(_page()))
+
+
+def test_adaptive_components_keep_their_assets() -> None:
+    @adaptive(threshold=1)
+    def widget(i: int) -> Node:
+        return div(asset(_CSS), asset_slot("widget"), asset(_JS, slot="body"), p(f"widget {i}"))
+
+    def page() -> Node:
+        return html(
+            head(title("assets"), asset_slot("head")),
+            # both built before rendering, and while rendering
+            body(widget(0), lazy(lambda: widget(0)), widget(1), asset_slot("body")),
+        )
+
+    expected_widget = '<div><p>widget {}</p></div>'
+    for _ in range(3):
+        assert render_with_assets(page()) == (
+            '<html><head><title>assets</title><link rel="stylesheet" href="/widget.css"/></head><body>'
+            + expected_widget.format(0) * 2
+            + expected_widget.format(1)
+            + '<script src="/widget.js"></script></body></html>'
+        )
+        # when streaming, the stylesheet goes in the next slot, as <head> was already sent
+        streamed = b"".join(stream_with_assets(page())).decode()
+        assert streamed.count("/widget.css") == 1 and streamed.count("/widget.js") == 1
+    assert widget.hits > 0
+
+    # without a collector, assets are rendered in place as usual
+    assert render(widget(1)) == (
+        '<link rel="stylesheet" href="/widget.css"/><script src="/widget.js"></script><div><p>widget 1</p></div>'
+    )
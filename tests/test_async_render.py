@@ -0,0 +1,166 @@
+import asyncio
+import time
+from time import perf_counter
+
+import pytest
+
+from simple_html import EarlyHints, Node, RenderBudget, RenderBudgetExceeded, RenderDigest, arender, astream, body, br, deferred, div, head, html, json_island, li, link, p, render, span, ul
+from simple_html.async_render import AsyncRenderStream
+
+
+async def _slow(node: Node, delay: float = 0.05) -> Node:
+    await asyncio.sleep(delay)
+    return node
+
+
+def test_arender_without_awaitables() -> None:
+    node = div({"class": "x"}, "a < b", br, [1, 2.5], (li(str(i)) for i in range(3)))
+
+    assert asyncio.run(arender(node)) == '<div class="x">a &lt; b<br/>12.5<li>0</li><li>1</li><li>2</li></div>'
+
+
+def test_arender_resolves_awaitables_in_order() -> None:
+    node = div(
+        _slow(p("first"), 0.03),
+        "middle & such",
+        ul(_slow(li("second"), 0.01), _slow([li("third"), _slow("<nested>")])),
+    )
+
+    assert asyncio.run(arender(node)) == render(
+        div(p("first"), "middle & such", ul(li("second"), li("third"), "<nested>"))
+    )
+
+
+def test_arender_is_concurrent() -> None:
+    start = perf_counter()
+    result = asyncio.run(arender(div(_slow(p(str(i)), 0.1) for i in range(5))))
+    elapsed = perf_counter() - start
+
+    assert result == "<div><p>0</p><p>1</p><p>2</p><p>3</p><p>4</p></div>"
+    assert elapsed < 0.3
+
+
+def test_arender_cancels_on_error() -> None:
+    async def fail() -> Node:
+        raise ValueError("nope")
+
+    async def run() -> "asyncio.Task[Node]":
+        slow = asyncio.ensure_future(_slow("slow", 1))
+        with pytest.raises(ValueError):
+            await arender(fail(), slow)
+        await asyncio.sleep(0)
+        return slow
+
+    assert asyncio.run(run()).cancelled()
+
+
+def _collect(stream: AsyncRenderStream) -> list[bytes]:
+    async def run() -> list[bytes]:
+        return [chunk async for chunk in stream]
+
+    return asyncio.run(run())
+
+
+def test_arender_resolves_deferred() -> None:
+    node = div(deferred(_slow(p("a")), fallback="loading"), deferred(lambda: "b", fallback="loading"))
+
+    assert asyncio.run(arender(node)) == "<div><p>a</p>b</div>"
+
+
+def test_astream_deferred() -> None:
+    async def widget() -> Node:
+        await asyncio.sleep(0.01)
+        return p("widget & co")
+
+    chunks = _collect(
+        astream(
+            div(deferred(widget, fallback=span("loading...")), _slow("after")),
+            ul(deferred(lambda: li("sync"))),
+        )
+    )
+    html = b"".join(chunks).decode()
+
+    # the shell, with fallbacks in place, goes out before any deferred content
+    assert chunks[0].decode().startswith(
+        '<div><template id="sh-deferred-0-start"></template><span>loading...</span>'
+        '<template id="sh-deferred-0-end"></template>after</div>'
+        '<ul><template id="sh-deferred-1-start"></template><template id="sh-deferred-1-end"></template></ul>'
+        "<script>function $shSwap(i){"
+    )
+    assert "sh-deferred-0\">" not in chunks[0].decode()
+    assert html.count("function $shSwap") == 1
+    assert '<template id="sh-deferred-0"><p>widget &amp; co</p></template><script>$shSwap(0)</script>' in html
+    assert '<template id="sh-deferred-1"><li>sync</li></template><script>$shSwap(1)</script>' in html
+
+
+def test_astream_matches_stream_without_deferred() -> None:
+    digest = RenderDigest()
+    node: list[Node] = [div(p(str(i)) for i in range(500)), _slow(br)]
+
+    chunks = _collect(astream(node, chunk_size=100, digest=digest))
+
+    expected = render([div([p(str(i)) for i in range(500)]), br]).encode()
+    assert len(chunks) > 1
+    assert b"".join(chunks) == expected
+    assert digest.content_length == len(expected)
+
+
+def test_astream_nonce() -> None:
+    html = b"".join(_collect(astream(deferred(_slow("x")), nonce="abc"))).decode()
+
+    assert html.count('<script nonce="abc">') == 2
+
+
+def test_astream_budget() -> None:
+    with pytest.raises(RenderBudgetExceeded):
+        _collect(astream(div(p(str(i)) for i in range(1000)), chunk_size=10, budget=RenderBudget(max_bytes=500)))
+
+    chunks = _collect(astream(div(p(str(i)) for i in range(1000)), budget=RenderBudget(max_nodes=7, truncate=True)))
+    assert b"".join(chunks) == b"<div><p>0</p><p>1</p></div>"
+
+
+def test_astream_budget_deadline_cancels_deferred() -> None:
+    cancelled = []
+
+    async def never() -> Node:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "never"
+
+    async def run() -> bytes:
+        budget = RenderBudget(deadline=time.monotonic() + 0.05, truncate=True)
+        chunks = [chunk async for chunk in astream(div(deferred(never, fallback="...")), budget=budget)]
+        await asyncio.sleep(0)
+        return b"".join(chunks)
+
+    start = perf_counter()
+    html = asyncio.run(run()).decode()
+
+    assert perf_counter() - start < 1
+    assert html.startswith('<div><template id="sh-deferred-0-start"></template>...')
+    assert "$shSwap(0)" not in html
+    assert cancelled == [True]
+
+
+def test_astream_early_hints() -> None:
+    links: list[str] = []
+    hints = EarlyHints(on_head_end=lambda h: links.extend(h.links))
+    page = html(head(link({"rel": "stylesheet", "href": "/a.css"})), body(deferred(_slow(p("x")))))
+
+    html_ = b"".join(_collect(astream(page, hints=hints))).decode()
+
+    assert links == ["</a.css>; rel=preload; as=style"]
+    assert html_.startswith('<html><head><link rel="stylesheet" href="/a.css"/></head>')
+
+
+def test_astream_json_island() -> None:
+    island = json_island({"rows": [{"id": i, "name": f"<{i}>"} for i in range(1000)]}, {"id": "data"})
+    page = div(island, deferred(_slow(p("x"))))
+
+    chunks = _collect(astream(page, chunk_size=64))
+
+    assert b"".join(chunks).startswith(render(div(island)).encode()[:-len("</div>")])
+    assert max(len(c) for c in chunks) < len(render(island)) / 3
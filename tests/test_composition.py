@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from simple_html import SafeString, a, body, br, component, div, img, p, render, render_composition
+
+
+def test_render_composition() -> None:
+    node = body(
+        component(
+            "nav",
+            div({"class": "nav"}, a({"href": "/"}, "Home & away"), br),
+            component("logo", img({"src": "/logo.png", "alt": "logo"})),
+        ),
+        p("<b>", 1, Decimal("2.5")),
+        SafeString("<i>pre</i>"),
+    )
+
+    html, report = render_composition(node)
+
+    assert html == render(node)
+    assert report.total == len(html.encode())
+    assert report.tags == {
+        "body": len("<body></body>"),
+        "div": len('<div class="nav"></div>'),
+        "a": len('<a href="/"></a>'),
+        "br": len("<br/>"),
+        "img": len('<img src="/logo.png" alt="logo"/>'),
+        "p": len("<p></p>"),
+    }
+    assert report.attributes == {
+        "class": len(' class="nav"'),
+        "href": len(' href="/"'),
+        "src": len(' src="/logo.png"'),
+        "alt": len(' alt="logo"'),
+    }
+    assert report.text == len("Home &amp; away") + len("&lt;b&gt;") + len("12.5")
+    assert report.escape_expansion == 4 + 6
+    assert report.safe == len("<i>pre</i>")
+    assert report.other == 0
+    assert sum(report.tags.values()) + report.text + report.safe + report.other == report.total
+    assert report.components == {
+        "nav": len('<div class="nav"><a href="/">Home &amp; away</a><br/></div><img src="/logo.png" alt="logo"/>'),
+        "logo": len('<img src="/logo.png" alt="logo"/>'),
+    }
+    assert "escaping added 10" in report.summary()
+
+
+def test_component_renders_children() -> None:
+    assert render(div(component("x", p("a"), "b"))) == "<div><p>a</p>b</div>"
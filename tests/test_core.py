@@ -1,4 +1,14 @@
+import hashlib
 import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from enum import IntEnum
+from pathlib import Path
+
+import pytest
 from decimal import Decimal
 from typing import Generator
 
@@ -23,8 +33,43 @@ from simple_html import (
     render,
     render_styles,
     img,
+    RenderDigest,
+    render_bytes,
+    stream,
+    escape_many,
+    Styles,
+    render_styles_cached,
+    register_safe_attribute_names,
+    register_safe_attribute_prefixes,
+    register_renderer,
+    is_compiled,
+    LocalizedPrerender,
+    footer,
+    RenderBudget,
+    RenderBudgetExceeded,
+    fingerprint,
+    li,
+    lazy,
+    render_subtree,
+    MappedPartial,
+    load_partial,
+    EarlyHints,
+    link,
+    title,
+    json_island,
 )
-from simple_html.core import escape_attribute_key
+from simple_html import core
+from simple_html.core import StyleKey, StyleValue, escape_attribute_key, _attribute_key_cache
+
+
+@pytest.fixture
+def restore_registrations(monkeypatch: pytest.MonkeyPatch) -> Generator[None, None, None]:
+    # the register functions replace these rather than changing them, so the originals
+    # can be put back afterwards
+    for name in ["_safe_attribute_names", "_safe_attribute_prefixes", "_registered_renderers", "_renderers"]:
+        monkeypatch.setattr(core, name, getattr(core, name))
+    yield
+    _attribute_key_cache.clear()
 
 
 def test_renders_no_children() -> None:
@@ -268,3 +313,517 @@ def test_tag_repr() -> None:
 
 def test_render_number_attributes() -> None:
     assert render(div({"x": 1, "y": 2.01, "z": Decimal("3.02")})) == '<div x="1" y="2.01" z="3.02"></div>'
+
+
+def test_render_bytes() -> None:
+    node = div({"class": "ok"}, "caf\u00e9 & co", br)
+    expected = render(node).encode()
+    assert render_bytes(node) == expected
+
+    digest = RenderDigest()
+    assert render_bytes(node, digest=digest) == expected
+    assert digest.content_length == len(expected)
+    assert digest.etag == f'"{hashlib.sha256(expected).hexdigest()}"'
+
+
+def test_stream() -> None:
+    expected = render(div([p(str(i)) for i in range(1000)])).encode()
+    node = div(p(str(i)) for i in range(1000))
+
+    digest = RenderDigest("md5")
+    chunks = list(stream(node, chunk_size=256, digest=digest))
+    assert len(chunks) > 1
+    assert b"".join(chunks) == expected
+    assert digest.content_length == len(expected)
+    assert digest.hexdigest() == hashlib.md5(expected).hexdigest()
+
+    assert list(stream([])) == []
+
+
+def test_escape_many() -> None:
+    assert escape_many([]) == []
+    assert escape_many(["a", "<b>", "", "'&\""]) == ["a", "&lt;b&gt;", "", "&#x27;&amp;&quot;"]
+    # the separator used internally can appear in the input
+    assert escape_many(["a\x00<", ">"]) == ["a\x00&lt;", "&gt;"]
+
+
+def test_render_list_of_strings() -> None:
+    assert render(["a", "<", "b&"]) == "a&lt;b&amp;"
+    assert render(div(["x", "y"], ["<", br])) == "<div>xy&lt;<br/></div>"
+
+
+def test_styles() -> None:
+    card = Styles({"display": "flex", "my-prop": "<x>"}, ["width", "<y>", SafeString("z")])
+
+    assert card() == SafeString("display:flex;my-prop:&lt;x&gt;;")
+    assert card({}) is card.static
+    assert card({"width": 10, "<y>": '"', SafeString("z"): SafeString("<z>")}) == SafeString(
+        'display:flex;my-prop:&lt;x&gt;;width:10;&lt;y&gt;:&quot;;z:<z>;'
+    )
+    assert card({"width": "1px"}) == render_styles(
+        {"display": "flex", "my-prop": "<x>", "width": "1px"}
+    )
+
+    with pytest.raises(KeyError):
+        card({"height": "1px"})
+
+
+def test_render_styles_cached() -> None:
+    styles: dict[StyleKey, StyleValue] = {"color": "red", "<k>": "<v>", "padding": Decimal("1.5")}
+
+    assert render_styles_cached(styles) == render_styles(styles)
+    assert render_styles_cached(styles) is render_styles_cached(dict(styles))
+    assert render_styles_cached({"color": SafeString("red")}) == SafeString("color:red;")
+
+
+def test_attribute_keys_are_cached() -> None:
+    assert render(div({"cache-me<": "1"})) == '<div cache-me&lt;="1"></div>'
+    assert _attribute_key_cache["cache-me<"] == "cache-me&lt;"
+    assert render(div({"cache-me<": "2"})) == '<div cache-me&lt;="2"></div>'
+
+
+def test_attribute_key_cache_keeps_recent_keys() -> None:
+    for i in range(5000):
+        render(div({f"data-row-{i}": "1"}))
+    render(div({"aria-label<": "x"}))
+
+    assert len(_attribute_key_cache) <= core._ATTRIBUTE_KEY_CACHE_SIZE
+    assert _attribute_key_cache["aria-label<"] == "aria-label&lt;"
+
+
+@pytest.mark.usefixtures("restore_registrations")
+def test_register_safe_attribute_names_and_prefixes() -> None:
+    register_safe_attribute_names("x-test-name", "test:name.a")
+    assert render(div({"x-test-name": "1", "test:name.a": None})) == '<div x-test-name="1" test:name.a></div>'
+
+    register_safe_attribute_prefixes("x-test-prefix-")
+    assert render(div({"x-test-prefix-ok": "1"})) == '<div x-test-prefix-ok="1"></div>'
+    # names with the prefix are still escaped if they include anything unsafe
+    assert render(div({"x-test-prefix-<": "1"})) == '<div x-test-prefix-&lt;="1"></div>'
+    assert render(div({"x-test-prefix-a b": "1"})) == '<div x-test-prefix-a&nbsp;b="1"></div>'
+
+    for bad in ["", "a b", "a=", "<a", "1a", 'a"']:
+        with pytest.raises(ValueError):
+            register_safe_attribute_names(bad)
+        with pytest.raises(ValueError):
+            register_safe_attribute_prefixes(bad)
+
+
+@pytest.mark.usefixtures("restore_registrations")
+def test_register_renderer() -> None:
+    class Money:
+        def __init__(self, cents: int) -> None:
+            self.cents = cents
+
+    class Euros(Money):
+        pass
+
+    with pytest.raises(TypeError):
+        render(Money(1))  # type: ignore[arg-type]
+
+    register_renderer(Money, lambda m: span({"class": "money"}, f"<{m.cents / 100:.2f}>"))
+
+    # registered types aren't part of `Node`
+    assert render(div(Money(150), Euros(5))) == (  # type: ignore[arg-type]
+        '<div><span class="money">&lt;1.50&gt;</span><span class="money">&lt;0.05&gt;</span></div>'
+    )
+
+
+@pytest.mark.usefixtures("restore_registrations")
+def test_register_renderer_while_rendering() -> None:
+    class Cents(int):
+        pass
+
+    page = div([li(i, Cents(i)) for i in range(200)])
+    expected = render(page)
+
+    # the table renders may be using is never changed, only replaced
+    table = core._renderers
+    entries = dict(table)
+    register_renderer(type("T", (), {}), str)
+    assert table == entries
+    errors: list[BaseException] = []
+
+    done = threading.Event()
+
+    def work() -> None:
+        try:
+            while not done.is_set():
+                assert render(page) == expected
+        except BaseException as e:
+            errors.append(e)
+
+    # switch threads as often as possible, so renders run between any two steps of registering
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for i in range(1000):
+            register_renderer(type(f"T{i}", (), {}), str)
+        done.set()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+
+
+def test_renders_subclasses_of_builtin_types() -> None:
+    class Size(IntEnum):
+        SMALL = 1
+
+    class MyStr(str):
+        pass
+
+    assert render(True, MyStr("<"), div(Size.SMALL)) == f"True&lt;<div>{Size.SMALL}</div>"
+
+
+def test_renders_html_protocol() -> None:
+    class Markup(str):
+        def __html__(self) -> str:
+            return self
+
+    class Widget:
+        def __html__(self) -> str:
+            return "<b>widget</b>"
+
+    assert render(p(Markup("<i>safe</i>"), Widget(), "<")) == "<p><i>safe</i><b>widget</b>&lt;</p>"
+
+
+def test_is_compiled_warning() -> None:
+    result = subprocess.run(
+        [sys.executable, "-W", "error::RuntimeWarning", "-c", "import simple_html"],
+        env={**os.environ, "SIMPLE_HTML_WARN_PURE_PYTHON": "1"},
+        capture_output=True,
+        text=True,
+    )
+
+    if is_compiled():
+        assert result.returncode == 0
+    else:
+        assert result.returncode != 0
+        assert "running as pure Python" in result.stderr
+
+
+def test_localized_prerender() -> None:
+    catalogs = {"en": {"about": "About us"}, "fr": {"about": "À propos & co"}}
+    calls: list[str] = []
+
+    def build(locale: str) -> Node:
+        calls.append(locale)
+        return footer(a({"href": "/about"}, catalogs[locale]["about"]))
+
+    localized = LocalizedPrerender(build, locales=["en"])
+    assert calls == ["en"]
+    assert localized("en") == SafeString('<footer><a href="/about">About us</a></footer>')
+    assert localized("fr") == SafeString('<footer><a href="/about">À propos &amp; co</a></footer>')
+    assert localized("fr") is localized("fr")
+    assert calls == ["en", "fr"]
+    assert localized.locales == ("en", "fr")
+
+    catalogs["fr"]["about"] = "À propos"
+    localized.reload("fr")
+    assert localized("fr") == SafeString('<footer><a href="/about">À propos</a></footer>')
+    assert calls == ["en", "fr", "fr"]
+
+    localized.reload()
+    assert calls == ["en", "fr", "fr", "en", "fr"]
+    assert render(div(localized("en"))) == '<div><footer><a href="/about">About us</a></footer></div>'
+
+
+def _runaway_rows() -> Generator[Node, None, None]:
+    i = 0
+    while True:
+        yield p(f"row {i}")
+        i += 1
+
+
+def test_render_budget_max_bytes() -> None:
+    with pytest.raises(RenderBudgetExceeded) as e:
+        render(div(_runaway_rows()), budget=RenderBudget(max_bytes=1000))
+    assert e.value.limit == "max_bytes"
+
+    truncated = render(div(_runaway_rows()), budget=RenderBudget(max_bytes=30, truncate=True))
+    # open elements are closed, beyond the limit
+    assert truncated == "<div><p>row 0</p><p>row 1</p></div>"
+
+    assert render(div("ok"), budget=RenderBudget(max_bytes=13)) == "<div>ok</div>"
+    assert render_bytes(div(_runaway_rows()), budget=RenderBudget(max_bytes=30, truncate=True)) == truncated.encode()
+    assert (
+        render_bytes(div(_runaway_rows()), digest=RenderDigest(), budget=RenderBudget(max_bytes=30, truncate=True))
+        == truncated.encode()
+    )
+
+
+def test_render_budget_counts_encoded_bytes() -> None:
+    # 2 bytes per character in UTF-8
+    text = "é" * 10
+    assert render(p(text), budget=RenderBudget(max_bytes=27)) == f"<p>{text}</p>"
+    with pytest.raises(RenderBudgetExceeded):
+        render(p(text), budget=RenderBudget(max_bytes=26))
+
+    budget = RenderBudget(max_bytes=60, truncate=True)
+    truncated = b"".join(stream(div(p(text) for _ in range(10)), chunk_size=10, budget=budget))
+    assert truncated == f"<div><p>{text}</p><p>{text}</p></div>".encode()
+
+
+def test_render_budget_truncate_closes_nested_elements() -> None:
+    page = html(head(title("t")), body(div(span(_runaway_rows()), p("after"))))
+    budget = RenderBudget(max_nodes=15, truncate=True)
+    expected = "<html><head><title>t</title></head><body><div><span><p>row 0</p><p>row 1</p></span></div></body></html>"
+
+    assert render(page, budget=budget) == expected
+    page = html(head(title("t")), body(div(span(_runaway_rows()), p("after"))))
+    assert b"".join(stream(page, chunk_size=4, budget=budget)) == expected.encode()
+
+
+def test_render_budget_max_nodes() -> None:
+    with pytest.raises(RenderBudgetExceeded) as e:
+        render_bytes(div(_runaway_rows()), digest=RenderDigest(), budget=RenderBudget(max_nodes=100))
+    assert e.value.limit == "max_nodes"
+
+    assert render(div(_runaway_rows()), budget=RenderBudget(max_nodes=4, truncate=True)) == "<div><p>row 0</p></div>"
+
+
+def test_render_budget_deadline() -> None:
+    with pytest.raises(RenderBudgetExceeded) as e:
+        render(div(_runaway_rows()), budget=RenderBudget(deadline=time.monotonic() + 0.05))
+    assert e.value.limit == "deadline"
+
+
+def test_stream_budget() -> None:
+    chunks = stream(div(_runaway_rows()), chunk_size=10, budget=RenderBudget(max_bytes=1000))
+    with pytest.raises(RenderBudgetExceeded):
+        for _ in chunks:
+            pass
+
+    digest = RenderDigest()
+    chunks = stream(
+        div(_runaway_rows()), chunk_size=10, digest=digest, budget=RenderBudget(max_bytes=30, truncate=True)
+    )
+    assert b"".join(chunks) == b"<div><p>row 0</p><p>row 1</p></div>"
+    assert digest.content_length == 35
+
+
+def test_fingerprint() -> None:
+    def tree(word: str) -> Node:
+        return div({"class": "x"}, [li(word), li(SafeString("<b>")), 1, 2.5, Decimal("3.0")], br)
+
+    assert fingerprint(tree("a")) == fingerprint(tree("a"))
+    assert fingerprint(tree("a")) != fingerprint(tree("b"))
+    assert len(fingerprint(tree("a"))) == 32
+
+    distinct = [
+        fingerprint("<b>"),
+        fingerprint(SafeString("<b>")),
+        fingerprint(1),
+        fingerprint("1"),
+        fingerprint(1.0),
+        fingerprint(Decimal("1")),
+        fingerprint(["a", "b"]),
+        fingerprint("a", "b"),
+        fingerprint("ab"),
+        fingerprint([["a"], "b"]),
+        fingerprint(p("a", "b")),
+        fingerprint(p(["a", "b"])),
+        fingerprint(br),
+        fingerprint(p),
+    ]
+    assert len(set(distinct)) == len(distinct)
+
+    # the fingerprint is stable across processes
+    assert fingerprint(p("a")) == fingerprint(p("a"))
+    result = subprocess.run(
+        [sys.executable, "-c", "from simple_html import fingerprint, p; print(fingerprint(p('a')))"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == fingerprint(p("a"))
+
+    with pytest.raises(TypeError):
+        fingerprint(div(li(str(i)) for i in range(3)))
+    with pytest.raises(TypeError):
+        fingerprint(object())  # type: ignore[arg-type]
+
+
+def test_lazy() -> None:
+    calls: list[str] = []
+
+    def sidebar() -> Node:
+        calls.append("sidebar")
+        return div({"id": "sidebar"}, "side")
+
+    node = body(lazy(sidebar), p("main"))
+    assert calls == []
+    assert render(node) == '<body><div id="sidebar">side</div><p>main</p></body>'
+    assert b"".join(stream(node, chunk_size=1)) == render(node).encode()
+    assert calls == ["sidebar", "sidebar", "sidebar"]
+
+
+def test_render_subtree() -> None:
+    calls: list[str] = []
+
+    def expensive(name: str) -> Node:
+        calls.append(name)
+        return div({"id": name}, p(name), div({"id": f"{name}-inner"}, "inner"))
+
+    page = html(
+        body(
+            lazy(lambda: expensive("header")),
+            div({"class": "main", "data-id": "results"}, [div({"id": "results"}, (p(str(i)) for i in range(2)))]),
+            lazy(lambda: expensive("footer")),
+        )
+    )
+
+    assert render_subtree(page, id="results") == '<div id="results"><p>0</p><p>1</p></div>'
+    assert calls == []
+
+    assert render_subtree(page, id="footer-inner") == '<div id="footer-inner">inner</div>'
+    assert calls == ["header", "footer"]
+
+    with pytest.raises(ValueError):
+        render_subtree(page, id="missing")
+
+
+def _replace_file(path: Path, content: str) -> None:
+    # mapped files must be replaced rather than rewritten in place
+    new_path = path.with_suffix(".new")
+    new_path.write_text(content, encoding="utf-8")
+    os.replace(new_path, path)
+
+
+def test_mapped_partial(tmp_path: Path) -> None:
+    path = tmp_path / "legal.html"
+    path.write_text("<p>Terms &amp; conditions — ünïcode</p>", encoding="utf-8")
+
+    partial = load_partial(str(path), check_interval=0)
+    assert load_partial(str(path), check_interval=0) is partial
+    # mapped once, checked as often as the most demanding caller asked for
+    assert load_partial(str(path), check_interval=5) is partial
+    assert partial.check_interval == 0
+
+    node = div(partial, "<")
+    expected = '<div><p>Terms &amp; conditions — ünïcode</p>&lt;</div>'
+    assert render(node) == expected
+    assert render_bytes(node) == expected.encode()
+    assert render_bytes(node, digest=RenderDigest()) == expected.encode()
+    assert b"".join(stream(node, chunk_size=7)) == expected.encode()
+    assert fingerprint(node) == fingerprint(div(load_partial(str(path), check_interval=0), "<"))
+
+    digest = partial.digest
+    _replace_file(path, "<p>New terms</p>")
+    assert render(node) == "<div><p>New terms</p>&lt;</div>"
+    assert partial.digest != digest
+
+    # touching the file without changing it keeps the current content
+    digest = partial.digest
+    os.utime(path, ns=(time.time_ns() + 10_000_000, time.time_ns() + 10_000_000))
+    assert render_bytes(node) == b"<div><p>New terms</p>&lt;</div>"
+    assert partial.digest == digest
+
+    _replace_file(path, "")
+    assert render_bytes(node) == b"<div>&lt;</div>"
+
+
+def test_mapped_partial_check_interval(tmp_path: Path) -> None:
+    path = tmp_path / "block.html"
+    path.write_text("<b>one</b>", encoding="utf-8")
+
+    partial = MappedPartial(str(path), check_interval=60)
+    _replace_file(path, "<b>two</b>")
+    assert render(partial) == "<b>one</b>"
+
+
+def _hinted_page() -> Node:
+    return html(
+        head(
+            title("hints"),
+            link({"rel": "stylesheet", "href": "/app.css"}),
+            link({"rel": "preload", "href": "/font.woff2", "as": "font", "type": "font/woff2", "crossorigin": None}),
+            link({"rel": "preconnect", "href": "https://cdn.example.com"}),
+            link({"rel": "icon", "href": "/favicon.ico"}),
+            script({"src": "/app.js?a=1&b=2"}),
+            script({"src": "/module.js", "type": "module"}),
+            script("inline()"),
+            link({"rel": "stylesheet", "href": "/bad>\r\nX-Injected: 1.css"}),
+        ),
+        body(script({"src": "/late.js"}), p("body")),
+    )
+
+
+def test_early_hints() -> None:
+    seen_at_head_end: list[str] = []
+    hints = EarlyHints(on_head_end=lambda h: seen_at_head_end.append(h.link_header()))
+
+    assert render(_hinted_page(), hints=hints) == render(_hinted_page())
+
+    head_links = [
+        "</app.css>; rel=preload; as=style",
+        "</font.woff2>; rel=preload; as=font; type=font/woff2; crossorigin",
+        "<https://cdn.example.com>; rel=preconnect",
+        "</app.js?a=1&b=2>; rel=preload; as=script",
+        "</module.js>; rel=modulepreload",
+    ]
+    assert seen_at_head_end == [", ".join(head_links)]
+    assert hints.links == head_links + ["</late.js>; rel=preload; as=script"]
+
+
+def test_early_hints_other_renderers() -> None:
+    expected = render(_hinted_page(), hints=EarlyHints()).encode()
+
+    hints = EarlyHints()
+    assert render_bytes(_hinted_page(), hints=hints) == expected
+    assert len(hints.links) == 6
+
+    hints = EarlyHints()
+    assert render_bytes(_hinted_page(), digest=RenderDigest(), hints=hints) == expected
+    assert len(hints.links) == 6
+
+    # the callback runs before the chunk with the end of <head> goes out
+    chunks_before_head_end: list[int] = []
+    chunks: list[bytes] = []
+    hints = EarlyHints(on_head_end=lambda h: chunks_before_head_end.append(len(chunks)))
+    for chunk in stream(_hinted_page(), chunk_size=10, hints=hints):
+        chunks.append(chunk)
+    assert b"".join(chunks) == expected
+    assert b"</head>" not in b"".join(chunks[:chunks_before_head_end[0]])
+    assert len(hints.links) == 6
+
+
+def test_json_island() -> None:
+    data = {
+        "title": "</script><script>alert(1)</script> & <!-- ünïcode \u2028",
+        "rows": [{"id": i, "name": f"<row {i}>", "tags": ["a", "b"]} for i in range(1000)],
+        1: [1.5, None, True],
+        "nested": {str(i): list(range(i)) for i in range(20)},
+    }
+    island = json_island(data, {"id": "data"})
+    html_ = render(div(island))
+
+    assert html_.startswith('<div><script type="application/json" id="data">')
+    assert html_.endswith("</script></div>")
+    content = html_[len('<div><script type="application/json" id="data">'):-len("</script></div>")]
+    assert "<" not in content and ">" not in content and "&" not in content
+    assert json.loads(content) == json.loads(json.dumps(data))
+
+    assert render_bytes(island) == render(island).encode()
+    assert b"".join(stream(div(island), chunk_size=64)) == html_.encode()
+    # streamed in chunks, rather than as one piece
+    assert max(len(c) for c in stream(island, chunk_size=64)) < len(html_) / 3
+    assert render(json_island([], {"id": "x"})) == '<script type="application/json" id="x">[]</script>'
+
+
+def test_json_island_errors() -> None:
+    with pytest.raises(TypeError):
+        render(json_island({"when": object()}))
+    assert render(json_island({"n": Decimal("1.5")}, default=str)) == (
+        '<script type="application/json">{"n":"1.5"}</script>'
+    )
+
+    cycle: list[object] = list(range(20))
+    cycle.append(cycle)
+    with pytest.raises(ValueError):
+        render(json_island(cycle))
@@ -0,0 +1,140 @@
+import threading
+
+import pytest
+
+from simple_html import (
+    DOCTYPE_HTML5,
+    ExtractedStyles,
+    SafeString,
+    body,
+    br,
+    div,
+    head,
+    html,
+    img,
+    p,
+    render,
+    render_extract_styles,
+    render_styles,
+    title,
+)
+
+
+def test_render_extract_styles() -> None:
+    red = render_styles({"color": "red", "margin": "0 1px"})
+    node = html(
+        head(title("styles")),
+        body(
+            div({"style": red}, p({"class": "a", "style": red}, "one")),
+            img({"style": render_styles({"width": "10px"}), "src": "/x.png"}),
+            p({"class": "", "style": red, "id": "y"}, br),
+        ),
+    )
+
+    rendered, styles = render_extract_styles(node)
+
+    assert styles.classes == {"color:red;margin:0 1px;": "_s0", "width:10px;": "_s1"}
+    assert rendered == (
+        "<html><head><title>styles</title>"
+        "<style>._s0:not(#\\#):not(#\\#):not(#\\#){color:red;margin:0 1px}"
+        "._s1:not(#\\#):not(#\\#):not(#\\#){width:10px}</style>"
+        "</head><body>"
+        '<div class="_s0"><p class="a _s0">one</p></div>'
+        '<img src="/x.png" class="_s1"/>'
+        '<p class="_s0" id="y"><br/></p>'
+        "</body></html>"
+    )
+
+
+def test_render_extract_styles_without_head() -> None:
+    rendered, _ = render_extract_styles(DOCTYPE_HTML5, div({"style": "color: blue !important"}))
+
+    assert rendered == (
+        '<!doctype html><style>._s0:not(#\\#):not(#\\#):not(#\\#){color: blue !important}</style><div class="_s0"></div>'
+    )
+
+    rendered, styles = render_extract_styles(div({"style": ""}, "x"))
+    assert rendered == '<div style="">x</div>'
+    assert styles.classes == {}
+
+
+def test_render_extract_styles_unescapes_for_style_block() -> None:
+    styles = ExtractedStyles("x-")
+    rendered, _ = render_extract_styles(
+        div({"style": render_styles({"background": 'url("a;b.png")', "content": "'</style>'"})}),
+        styles=styles,
+        inline=False,
+    )
+
+    assert rendered == '<div class="x-0"></div>'
+    assert styles.css() == (
+        '.x-0:not(#\\#):not(#\\#):not(#\\#){background:url("a;b.png");content:\'\\3c /style>\'}'
+    )
+
+
+def test_extract_styles_important() -> None:
+    styles = ExtractedStyles(important=True)
+    render_extract_styles(
+        div({"style": render_styles({"background": 'url("a;b.png")', "color": "red !important"})}),
+        styles=styles,
+    )
+
+    assert styles.css() == '._s0{background:url("a;b.png") !important;color:red !important}'
+
+
+def test_extract_styles_shared_across_renders() -> None:
+    styles = ExtractedStyles()
+    render_extract_styles(div({"style": "a:1"}), styles=styles)
+    rendered, _ = render_extract_styles(
+        div({"style": "b:2"}), SafeString('<span style="a:1">x</span>'), styles=styles, inline=False
+    )
+
+    assert rendered == '<div class="_s1"></div><span class="_s0">x</span>'
+
+
+def test_extract_styles_shared_across_threads() -> None:
+    styles = ExtractedStyles()
+
+    def work(n: int) -> None:
+        for i in range(200):
+            render_extract_styles(div({"style": f"order:{i % 50 + n}"}), styles=styles)
+
+    threads = [threading.Thread(target=work, args=(n * 50,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(styles.classes) == 200
+    assert len(set(styles.classes.values())) == 200
+
+
+@pytest.mark.parametrize(
+    "style",
+    [
+        "color:red}body{display:none",
+        "color:red;/* x",
+        "color:red;@import url(x.css)",
+        "background:url(x.png",
+        "content:'x",
+        "content:'x\\",
+    ],
+)
+def test_extract_styles_leaves_unbalanced_styles_inline(style: str) -> None:
+    node = html(head(title("t")), body(div({"style": style}, "hi"), p({"style": "color:blue"})))
+
+    rendered, styles = render_extract_styles(node)
+
+    assert list(styles.classes) == ["color:blue"]
+    assert rendered == render(
+        html(
+            head(title("t"), SafeString("<style>._s0:not(#\\#):not(#\\#):not(#\\#){color:blue}</style>")),
+            body(div({"style": style}, "hi"), p({"class": "_s0"})),
+        )
+    )
+
+
+def test_extract_styles_allows_braces_in_strings() -> None:
+    _, styles = render_extract_styles(div({"style": "content:'}/*@';background:url(\"a)b.png\")"}))
+
+    assert styles.css() == "._s0:not(#\\#):not(#\\#):not(#\\#){content:'}/*@';background:url(\"a)b.png\")}"
@@ -0,0 +1,44 @@
+import gc
+
+from simple_html import div, p, prerender, render
+from simple_html import freeze_prerendered, gc_paused
+
+
+def test_gc_paused() -> None:
+    assert gc.isenabled()
+    with gc_paused():
+        assert not gc.isenabled()
+        with gc_paused():
+            assert not gc.isenabled()
+        assert not gc.isenabled()
+        assert render(div([p(str(i)) for i in range(1000)])).startswith("<div><p>0</p>")
+    assert gc.isenabled()
+
+
+def test_gc_paused_restores_on_error() -> None:
+    try:
+        with gc_paused():
+            raise ValueError
+    except ValueError:
+        pass
+    assert gc.isenabled()
+
+
+def test_gc_paused_keeps_gc_disabled() -> None:
+    gc.disable()
+    try:
+        with gc_paused():
+            pass
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
+
+
+def test_freeze_prerendered() -> None:
+    footer = prerender(div("footer"))
+    try:
+        freeze_prerendered()
+        assert gc.get_freeze_count() > 0
+        assert render(div(footer)) == "<div><div>footer</div></div>"
+    finally:
+        gc.unfreeze()
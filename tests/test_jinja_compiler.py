@@ -0,0 +1,152 @@
+import inspect
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+from simple_html import render
+
+jinja2 = pytest.importorskip("jinja2")
+
+from simple_html_tools.jinja_compiler import UnsupportedJinjaFeature, compile_templates  # noqa: E402
+
+
+def _compile(env: Any, names: list[str]) -> dict[str, Callable[..., Any]]:
+    namespace: dict[str, Any] = {}
+    exec(compile_templates(env, names), namespace)
+    return namespace
+
+
+def _call(fn: Callable[..., Any], context: dict[str, Any]) -> str:
+    params = inspect.signature(fn).parameters
+    return render(fn(**{k: v for k, v in context.items() if k in params}))
+
+
+def test_compiles_bench_templates() -> None:
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(Path(__file__).parent.parent / "bench/jinja_example/templates"),
+        autoescape=jinja2.select_autoescape(),
+    )
+    names = ["basic.html", "basic_long.html", "hello_world.html", "lorem_ipsum.html", "large_page.html"]
+    functions = _compile(env, names)
+    context = {"title": "<title>", "content": "a & b", "oks": ["<b>ok</b>", "fine"]}
+
+    for name in names:
+        assert _call(functions[name.split(".")[0]], context) == env.get_template(name).render(**context)
+
+
+def test_compiles_supported_subset() -> None:
+    env = jinja2.Environment(
+        loader=jinja2.DictLoader(
+            {
+                "base.html": (
+                    "<html><head>{% block head %}<title>{{ title }}</title>{% endblock %}</head>"
+                    "<body>{% block body %}{% endblock %}{% include 'parts/footer.html' %}</body></html>"
+                ),
+                "page.html": (
+                    "{% extends 'base.html' %}{% block body %}{% set n = items|length %}"
+                    "<ul>{% for k, v in items if v > 0 %}"
+                    "<li class=\"{{ 'first' if loop.first else '' }}\">"
+                    "{{ loop.index }}/{{ loop.length }} {{ k|upper }}={{ v * 2 }}</li>"
+                    "{% else %}<li>none</li>{% endfor %}</ul>"
+                    "{% if n > 2 %}many{% elif n %}{{ 'few' }}{% else %}{{ '<none>' }}{% endif %}"
+                    "{{ tags|join(', ') }}{{ missing|default('-') }}{% endblock %}"
+                ),
+                "parts/footer.html": "<footer>{{ user.name ~ '!' }}{{ html|safe }}</footer>",
+            }
+        ),
+        autoescape=True,
+    )
+    functions = _compile(env, ["page.html", "parts/footer.html"])
+
+    class User:
+        name = "<me>"
+
+    for items in [[("a", 1), ("b", 0), ("c", 3)], [], [("a", 1), ("b", 2), ("c", 3)]]:
+        context = {
+            "title": "t&t",
+            "items": items,
+            "user": User(),
+            "html": "<i>x</i>",
+            "tags": ["x", "<y>"],
+            "missing": None,
+        }
+        assert _call(functions["page"], context) == env.get_template("page.html").render(
+            **{**context, "missing": jinja2.Undefined()}
+        )
+    assert _call(functions["parts_footer"], context) == env.get_template("parts/footer.html").render(**context)
+
+
+def test_without_autoescape() -> None:
+    env = jinja2.Environment(loader=jinja2.DictLoader({"a.txt": "<p>{{ x }}{{ '<' }}</p>"}))
+
+    assert _call(_compile(env, ["a.txt"])["a"], {"x": "<b>"}) == "<p><b><</p>"
+
+
+@pytest.mark.parametrize("autoescape", [False, True])
+def test_markup_filters(autoescape: bool) -> None:
+    source = "{{ x|e }}{{ x|escape }}{{ y|safe }}{% for i in range(3) %}{{ i }}{% endfor %}{{ 2.56|round(1) }}"
+    env = jinja2.Environment(loader=jinja2.DictLoader({"t.html": source}), autoescape=autoescape)
+    context = {"x": "<script>", "y": "<b>ok</b>"}
+
+    expected = env.get_template("t.html").render(**context)
+    assert expected == "&lt;script&gt;&lt;script&gt;<b>ok</b>0122.6"
+    assert _call(_compile(env, ["t.html"])["t"], context) == expected
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "{{ x }}{% for x in xs %}{{ x }}{% endfor %}|{{ x }}",
+        "{% for x in xs %}{% set y = x %}{{ y }}{% endfor %}{{ x }}{{ y }}",
+        "{{ x }}{% set x = 1 %}{{ x }}{% set x = x + 1 %}{{ x }}",
+        "{% if c %}{% set x = 1 %}{% endif %}{{ x }}",
+        "{% for i in xs %}{{ y }}{% if i > 1 %}{% set y = i %}{% endif %}{{ y }}{% endfor %}{{ y }}",
+        "{% for i in xs %}{% include 'part.html' %}{% endfor %}{{ z }}",
+        "{% block b %}{% set x = 1 %}{{ x }}{% endblock %}{{ x }}",
+    ],
+)
+def test_scopes(source: str) -> None:
+    env = jinja2.Environment(loader=jinja2.DictLoader({"t.html": source, "part.html": "{{ i }}{% set z = 1 %}"}))
+    context = {"x": "ctx", "y": "cy", "z": "cz", "xs": [1, 2], "c": False}
+
+    assert _call(_compile(env, ["t.html"])["t"], context) == env.get_template("t.html").render(**context)
+
+
+def test_default_variables_are_optional() -> None:
+    env = jinja2.Environment(loader=jinja2.DictLoader({"t.html": "{{ a|default('-') }}{{ b|d(a) }}"}))
+    t = _compile(env, ["t.html"])["t"]
+
+    assert render(t(a="a")) == "aa"
+    assert render(t(a="a", b="b")) == "ab"
+    with pytest.raises(TypeError):
+        t()
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "{% if false %}{% include 't.html' %}{% endif %}",
+        "{% include 'cycle.html' %}",
+        "{% extends 'cycle.html' %}",
+        "{% macro m() %}{% endmacro %}",
+        "{{ x|wordcount }}",
+        "{% for x in y recursive %}{% endfor %}",
+        "{% include name %}",
+        "{{ loop }}",
+        "{{ x is defined }}",
+        "{% block b %}{{ super() }}{% endblock %}",
+        "{{ namespace() }}",
+        "{{ x|round(1, 'floor') }}",
+        "{{ x|round(method='floor') }}",
+        "{{ x|safe|upper }}",
+        "{{ x|e|length }}",
+        "{{ 'a' ~ x|safe }}",
+        "{% set y = x|safe %}",
+    ],
+)
+def test_unsupported(source: str) -> None:
+    env = jinja2.Environment(loader=jinja2.DictLoader({"t.html": source, "cycle.html": "{% include 't.html' %}"}))
+
+    with pytest.raises(UnsupportedJinjaFeature):
+        compile_templates(env, ["t.html"])
@@ -0,0 +1,126 @@
+from typing import Generator
+
+from simple_html import Node, adaptive, div, li, p, render, render_composition, ul
+
+
+def test_adaptive_promotes_after_identical_renders() -> None:
+    calls: list[str] = []
+
+    @adaptive(threshold=3)
+    def greeting(name: str) -> Node:
+        calls.append(name)
+        return p("Hello, ", name)
+
+    for _ in range(5):
+        assert render(div(greeting("<you>"))) == "<div><p>Hello, &lt;you&gt;</p></div>"
+
+    assert calls == ["<you>"] * 3
+    assert (greeting.hits, greeting.misses, greeting.promoted) == (2, 3, 1)
+
+    greeting("other")
+    assert calls[-1] == "other"
+    assert greeting.promoted == 1
+
+
+def test_adaptive_resets_streak_when_output_changes() -> None:
+    counter = [0]
+
+    @adaptive(threshold=2)
+    def clock() -> Node:
+        counter[0] += 1
+        return p(str(counter[0] // 2))
+
+    assert [render(clock()) for _ in range(4)] == ["<p>0</p>", "<p>1</p>", "<p>1</p>", "<p>1</p>"]
+    assert counter[0] == 3
+    assert clock.promoted == 1
+
+
+def test_adaptive_bump_version() -> None:
+    data = {"title": "a"}
+
+    @adaptive(threshold=1)
+    def header() -> Node:
+        return p(data["title"])
+
+    assert render(header()) == "<p>a</p>"
+    data["title"] = "b"
+    assert render(header()) == "<p>a</p>"
+    header.bump_version()
+    assert render(header()) == "<p>b</p>"
+
+
+def test_adaptive_unhashable_inputs() -> None:
+    @adaptive(threshold=1)
+    def items(children: list[Node], options: dict[str, str]) -> Node:
+        return ul(children)
+
+    assert render(items([li("a")], options={})) == "<ul><li>a</li></ul>"
+    assert render(items([li("a")], options={})) == "<ul><li>a</li></ul>"
+    assert items.hits == 0
+
+    @adaptive(threshold=1)
+    def node_items(children: list[Node]) -> Node:
+        return ul(children)
+
+    node_items([li("a")])
+    assert render(node_items([li("a")])) == "<ul><li>a</li></ul>"
+    assert render(node_items([li("b")])) == "<ul><li>b</li></ul>"
+    assert node_items.hits == 1
+
+
+def test_adaptive_is_a_labelled_component() -> None:
+    @adaptive(label="nav")
+    def nav() -> Node:
+        return p("nav")
+
+    _, report = render_composition(div(nav()))
+    assert report.components == {"nav": len("<p>nav</p>")}
+
+
+def test_adaptive_keys_distinguish_types_and_keywords() -> None:
+    @adaptive(threshold=1)
+    def value(v: object) -> Node:
+        return p(str(v))
+
+    assert [render(value(v)) for v in (1, True, 1.0, 1, True, 1.0)] == ["<p>1</p>", "<p>True</p>", "<p>1.0</p>"] * 2
+
+    @adaptive(threshold=1)
+    def labelled(items: list[Node], a: str, b: str) -> Node:
+        return ul([li(a, b, item) for item in items])
+
+    assert render(labelled([p("x")], a="1", b="2")) == "<ul><li>12<p>x</p></li></ul>"
+    assert render(labelled([p("x")], b="1", a="2")) == "<ul><li>21<p>x</p></li></ul>"
+
+
+def test_adaptive_evicts_least_recently_used() -> None:
+    @adaptive(threshold=2, max_entries=4)
+    def card(title: str) -> Node:
+        return p(title)
+
+    for i in range(10):
+        card(str(i))
+    for _ in range(10):
+        card("stable")
+    assert (card.promoted, card.hits) == (1, 8)
+
+    for i in range(3):
+        card(str(i))
+        card(str(i))
+    card("stable")
+    assert (card.promoted, card.hits) == (4, 9)
+    card("3")
+    card("3")
+    assert card.promoted == 4
+    # "0" was dropped instead, since "stable" was used more recently
+    card("stable")
+    assert card.hits == 10
+
+
+def test_adaptive_doesnt_cache_generators() -> None:
+    @adaptive(threshold=1)
+    def items(children: Generator[Node, None, None]) -> Node:
+        return ul(children)
+
+    for _ in range(3):
+        assert render(items(li(str(i)) for i in range(2))) == "<ul><li>0</li><li>1</li></ul>"
+    assert (items.promoted, items.hits, items.misses) == (0, 0, 0)
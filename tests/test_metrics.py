@@ -0,0 +1,151 @@
+import threading
+from typing import Generator
+
+import pytest
+
+from simple_html import (
+    Node,
+    adaptive,
+    disable_metrics,
+    div,
+    enable_metrics,
+    lazy,
+    metrics_snapshot,
+    p,
+    prerender,
+    render,
+    render_bytes,
+    render_parallel,
+    render_styles_cached,
+    render_table,
+    reset_metrics,
+    stream,
+)
+from simple_html.core import RENDER_TIME_BUCKETS
+
+
+@pytest.fixture(autouse=True)
+def metrics() -> Generator[None, None, None]:
+    reset_metrics()
+    enable_metrics(sample_every=1)
+    yield
+    disable_metrics()
+    reset_metrics()
+
+
+def test_counts_renders() -> None:
+    node = div(p("fish & chips"), p("plain"), "<b>")
+
+    html = render(node)
+    render_bytes(node)
+    assert b"".join(stream(node, chunk_size=4)) == html.encode()
+
+    snapshot = metrics_snapshot()
+    assert snapshot.renders == 3
+    assert snapshot.output_chars == len(html)
+    assert snapshot.output_bytes == 2 * len(html.encode())
+    assert snapshot.escapes == 6
+    # streams aren't timed
+    assert snapshot.sampled == 2
+    assert sum(snapshot.buckets) == 2
+    assert len(snapshot.buckets) == len(RENDER_TIME_BUCKETS) + 1
+    assert snapshot.sampled_seconds > 0
+
+    reset_metrics()
+    snapshot = metrics_snapshot()
+    assert (snapshot.renders, snapshot.output_chars, snapshot.output_bytes, snapshot.escapes) == (0, 0, 0, 0)
+    assert snapshot.sampled == 0
+
+
+def test_sampling_and_disabling() -> None:
+    enable_metrics(sample_every=10)
+    for _ in range(25):
+        render(div("x"))
+    snapshot = metrics_snapshot()
+    assert snapshot.renders == 25
+    assert snapshot.sampled == 3
+
+    disable_metrics()
+    render(div("x"))
+    assert metrics_snapshot().renders == 25
+
+
+def test_nested_renders_count_once() -> None:
+    @adaptive(label="nested_card", threshold=1)
+    def card(title: str) -> Node:
+        return div(title)
+
+    for _ in range(3):
+        # called while rendering, so the component's own render is part of this one
+        render(div(lazy(lambda: card("a"))))
+
+    snapshot = metrics_snapshot()
+    assert snapshot.renders == 3
+    assert snapshot.caches["adaptive.nested_card"] == (2, 1)
+    assert snapshot.hit_rate("adaptive.nested_card") == 2 / 3
+    assert snapshot.hit_rate("unknown") is None
+
+
+def test_parallel_render_counts_once() -> None:
+    node = div([p(str(i), "<") for i in range(50)])
+
+    html = render_parallel(node, tasks=8)
+
+    snapshot = metrics_snapshot()
+    assert snapshot.renders == 1
+    assert snapshot.output_chars == len(html)
+    assert snapshot.escapes == 50
+    assert snapshot.sampled == 1
+
+
+def test_renders_while_building_trees_arent_counted() -> None:
+    @adaptive(label="build_card", threshold=10)
+    def card(title: str) -> Node:
+        return div(title)
+
+    node = div(
+        [card(str(i)) for i in range(5)],
+        prerender(p("static")),
+        render_table(["a", "b"], [[1, p("x")], [2, "y"]]),
+    )
+    assert metrics_snapshot().renders == 0
+
+    render(node)
+    assert metrics_snapshot().renders == 1
+
+
+def test_threads_are_added_up() -> None:
+    def work() -> None:
+        for _ in range(100):
+            render(div("<"))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    snapshot = metrics_snapshot()
+    assert snapshot.renders == 400
+    assert snapshot.escapes == 400
+
+
+def test_exporters() -> None:
+    before = metrics_snapshot()
+    render_styles_cached({"color": "red"})
+    render_styles_cached({"color": "red"})
+    render(div("a"))
+
+    snapshot = metrics_snapshot().since(before)
+    assert snapshot.caches["render_styles_cached"] == (1, 1)
+
+    text = snapshot.prometheus()
+    assert "simple_html_renders_total 1\n" in text
+    assert "simple_html_output_chars_total 12\n" in text
+    assert 'simple_html_render_seconds_bucket{le="+Inf"} 1\n' in text
+    assert "simple_html_render_seconds_count 1\n" in text
+    assert 'simple_html_cache_hits_total{cache="render_styles_cached"} 1\n' in text
+
+    lines = snapshot.statsd(prefix="app.html")
+    assert "app.html.renders:1|c" in lines
+    assert "app.html.cache.render_styles_cached.hit_rate:0.5000|g" in lines
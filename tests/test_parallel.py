@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from simple_html import Node, DOCTYPE_HTML5, body, br, div, head, html, li, p, render, render_parallel, title, ul
+
+
+def _page() -> list[Node]:
+    return [
+        DOCTYPE_HTML5,
+        html(
+            head(title("parallel")),
+            body(
+                div({"id": str(i)}, p("a < b"), ul(li(str(j)) for j in range(20)), br)
+                for i in range(50)
+            ),
+        ),
+    ]
+
+
+def test_render_parallel_matches_render() -> None:
+    expected = render(*_page())
+
+    assert render_parallel(*_page()) == expected
+    assert render_parallel(*_page(), tasks=1) == expected
+    assert render_parallel(*_page(), tasks=1000) == expected
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        assert render_parallel(*_page(), executor=executor, tasks=7) == expected
+
+
+def test_render_parallel_empty() -> None:
+    assert render_parallel() == ""
+    empty: list[Node] = []
+    assert render_parallel([], (x for x in empty)) == ""
+    assert render_parallel("<") == "&lt;"
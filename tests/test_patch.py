@@ -0,0 +1,56 @@
+from simple_html import Node, PatchRenderer, div, h2, li, p, render, span, ul
+
+
+def _panel(values: dict[str, int], title: str = "Stats", items: tuple[str, ...] = ("a", "b")) -> list[Node]:
+    return [
+        h2(title),
+        div(
+            {"id": "panel"},
+            p("Live values"),
+            [div({"id": f"stat-{name}"}, span(name), ": ", str(value)) for name, value in values.items()],
+            ul({"id": "items"}, [li({"id": f"item-{item}"}, item) for item in items]),
+        ),
+    ]
+
+
+def test_first_update_is_full_render() -> None:
+    renderer = PatchRenderer()
+    node = _panel({"cpu": 1})
+
+    assert renderer.update(node) == [(None, render(node))]
+    assert renderer.update(node) == []
+
+
+def test_only_changed_keyed_subtrees() -> None:
+    renderer = PatchRenderer()
+    renderer.update(_panel({"cpu": 1, "mem": 2}))
+
+    assert renderer.update(_panel({"cpu": 1, "mem": 3})) == [
+        ("stat-mem", render(div({"id": "stat-mem"}, span("mem"), ": ", "3")))
+    ]
+    assert renderer.update(_panel({"cpu": 5, "mem": 3}, items=("a", "<b>"))) == [
+        ("stat-cpu", render(div({"id": "stat-cpu"}, span("cpu"), ": ", "5"))),
+        ("items", render(ul({"id": "items"}, li({"id": "item-a"}, "a"), li({"id": "item-<b>"}, "<b>")))),
+    ]
+
+
+def test_outermost_change_wins() -> None:
+    renderer = PatchRenderer()
+    renderer.update(_panel({"cpu": 1}))
+
+    # adding a keyed child changes the parent's own content, so only the parent is replaced
+    patches = renderer.update(_panel({"cpu": 2, "mem": 3}))
+    assert [key for key, _ in patches] == ["panel"]
+
+    # a change outside of any keyed element needs the whole output
+    node = _panel({"cpu": 2, "mem": 3}, title="New title")
+    assert renderer.update(node) == [(None, render(node))]
+
+
+def test_reset() -> None:
+    renderer = PatchRenderer()
+    node = _panel({"cpu": 1})
+    renderer.update(node)
+    renderer.reset()
+
+    assert renderer.update(node) == [(None, render(node))]
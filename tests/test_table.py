@@ -0,0 +1,75 @@
+from decimal import Decimal
+from typing import Union
+
+import pytest
+
+from simple_html import SafeString, a, render, render_table, span, table, tbody, td, th, thead, tr
+
+
+def test_render_table_matches_tags() -> None:
+    rows: list[tuple[str, int, Union[float, Decimal]]] = [("a & b", 1, 1.5), ("<c>", -2, Decimal("0.25"))]
+
+    assert render(render_table(["name", "n", "x"], rows)) == render(
+        table(
+            thead(tr(th("name"), th("n"), th("x"))),
+            tbody([tr([td(cell) for cell in row]) for row in rows]),
+        )
+    )
+
+
+def test_render_table_dict_of_columns() -> None:
+    assert render_table(
+        ["name", "link"],
+        {
+            "link": [a({"href": "/1"}, "one"), SafeString("<b>two</b>")],
+            "name": ["x", "y"],
+            "unused": [1, 2],
+        },
+    ) == SafeString(
+        "<table><thead><tr><th>name</th><th>link</th></tr></thead><tbody>"
+        '<tr><td>x</td><td><a href="/1">one</a></td></tr>'
+        "<tr><td>y</td><td><b>two</b></td></tr>"
+        "</tbody></table>"
+    )
+
+
+def test_render_table_mixed_column_and_attrs() -> None:
+    assert render_table(["v"], iter([["<"], [3], [span("s")]]), {"class": "t"}) == SafeString(
+        '<table class="t"><thead><tr><th>v</th></tr></thead><tbody>'
+        "<tr><td>&lt;</td></tr><tr><td>3</td></tr><tr><td><span>s</span></td></tr>"
+        "</tbody></table>"
+    )
+
+
+def test_render_table_empty() -> None:
+    assert render_table(["a"], []) == SafeString(
+        "<table><thead><tr><th>a</th></tr></thead><tbody></tbody></table>"
+    )
+
+
+def test_render_table_wrong_column_count() -> None:
+    with pytest.raises(ValueError):
+        render_table(["a", "b"], [(1, 2, 3)])
+
+
+@pytest.mark.parametrize(
+    "rows",
+    [
+        [(1, 2), (3, 4, 5)],
+        [(1, 2, 3), (4, 5)],
+        [(1, 2), (3,)],
+        {"a": [1, 2, 3], "b": [1]},
+        {"a": [1], "b": [1, 2]},
+    ],
+)
+def test_render_table_ragged_rows(rows: object) -> None:
+    with pytest.raises(ValueError):
+        render_table(["a", "b"], rows)
+
+
+def test_render_table_numpy() -> None:
+    np = pytest.importorskip("numpy")
+
+    expected = render_table(["a", "b"], [[1, 2], [3, 4]])
+    assert render_table(["a", "b"], np.array([[1, 2], [3, 4]])) == expected
+    assert render_table(["a", "b"], {"a": np.array([1, 3]), "b": np.array([2, 4])}) == expected